@@ -0,0 +1,159 @@
+"""Compares the throughput of :class:`stomp.codec.Decoder` with the
+byte-at-a-time decoder it replaced.
+
+Usage:
+
+    PYTHONPATH=src python benchmarks/decode.py
+"""
+import collections
+import functools
+import io
+import timeit
+
+from stomp.codec import Codec
+from stomp.const import *
+from stomp.exc import MalformedFrame
+from stomp.exc import InvalidCommandType
+
+
+# The legacy decoder grows NULL-terminated bodies octet by octet, which is
+# quadratic; it is not measured above this size.
+LEGACY_MAX_UNFRAMED = 64 * 1024
+
+SIZES = [
+    ('1 KB', 1024),
+    ('64 KB', 64 * 1024),
+    ('4 MB', 4 * 1024 * 1024)
+]
+
+
+class LegacyDecoder(object):
+    """The octet-by-octet decoder, kept as a baseline."""
+
+    def __init__(self, codec, buf):
+        self.buf = buf
+        self.content_length = None
+        self.command = ''
+        self.body = b''
+        self.raw_headers = ''
+        self.headers = []
+        self.codec = codec
+
+    def decode(self):
+        octet_prime = self.buf.read(1).decode(self.codec.encoding)
+        while octet_prime == LF:
+            octet_prime = self.buf.read(1).decode(self.codec.encoding)
+
+        if not octet_prime:
+            raise EOFError
+
+        self.buf.seek(self.buf.tell() - 1)
+        while True:
+            octet = self.buf.read(1).decode(self.codec.encoding)
+            if not octet:
+                break
+            if octet == LF:
+                break
+            if octet == CR:
+                continue
+            self.command += octet
+
+        if self.command not in FRAME_TYPES:
+            raise InvalidCommandType("Not a STOMP command: " + self.command)
+
+        while True:
+            octet = self.buf.read(1).decode(self.codec.encoding)
+            if not octet:
+                raise MalformedFrame("Unexpected end of byte-stream.")
+
+            if self.raw_headers and (self.raw_headers[-1] == LF) and (octet == LF):
+                break
+
+            if octet == CR:
+                continue
+
+            self.raw_headers += octet
+
+        self._parse_headers()
+        self._parse_body()
+        return self.command, self.headers, self.body
+
+    def _parse_headers(self):
+        headers = collections.OrderedDict()
+        f = functools.partial(self.codec.unescape, self.command)
+        for pair in filter(bool, self.raw_headers.split(LF)):
+            key, val = map(f, pair.rstrip(CR).split(':'))
+            if key in headers:
+                continue
+
+            headers[key] = val
+
+        if 'content-length' in headers:
+            self.content_length = int(headers['content-length'])
+
+        self.headers = list([tuple(x) for x in headers.items()])
+
+    def _parse_body(self):
+        if self.content_length:
+            self.body = self.buf.read(self.content_length)
+            octet = self.buf.read(1).decode(self.codec.encoding)
+            if octet != NULL:
+                raise MalformedFrame("Frame body too large.")
+        else:
+            while True:
+                octet = self.buf.read(1)
+                if not octet or (octet.decode(self.codec.encoding) == NULL):
+                    break
+                self.body += octet
+
+
+def measure(decoder_class, codec, msg):
+    def run():
+        decoder_class(codec, io.BytesIO(msg)).decode()
+
+    # Run at least once and for at least 0.2 seconds.
+    number, elapsed = 1, 0
+    while True:
+        elapsed = timeit.timeit(run, number=number)
+        if elapsed > 0.2:
+            break
+        number *= 2
+    return elapsed / number
+
+
+def main():
+    from stomp.codec import Decoder
+    codec = Codec()
+    headers = [
+        ('destination', '/queue/benchmark'),
+        ('message-id', 'ID:benchmark-1'),
+        ('subscription', '1'),
+        ('content-type', 'application/octet-stream')
+    ]
+    row = "{0:<8} {1:<18} {2:>12} {3:>12} {4:>9}"
+    print(row.format('body', 'framing', 'legacy (ms)', 'bulk (ms)', 'speedup'))
+    for label, size in SIZES:
+        body = b'x' * size
+        with_length = codec.encode(MESSAGE, headers, body)
+        without_length = with_length.replace(
+            'content-length:{0}\n'.format(size).encode(), b'')
+        cases = [
+            ('content-length', with_length),
+            ('NULL-terminated', without_length)
+        ]
+        for framing, msg in cases:
+            bulk = measure(Decoder, codec, msg)
+            if framing != 'content-length' and size > LEGACY_MAX_UNFRAMED:
+                print(row.format(label, framing, 'n/a',
+                    '{0:.3f}'.format(bulk * 1000), 'n/a'))
+                continue
+            assert (LegacyDecoder(codec, io.BytesIO(msg)).decode()
+                == Decoder(codec, io.BytesIO(msg)).decode())
+            legacy = measure(LegacyDecoder, codec, msg)
+            print(row.format(label, framing, '{0:.3f}'.format(legacy * 1000),
+                '{0:.3f}'.format(bulk * 1000),
+                '{0:.0f}x'.format(legacy / bulk)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+from stomp.aio.connection import AsyncConnection
+from stomp.aio.transport import AsyncTransport
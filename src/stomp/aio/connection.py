@@ -0,0 +1,301 @@
+import asyncio
+import time
+
+from stomp.codec import Codec
+from stomp.exc import ConnectionLost
+from stomp.exc import FatalException
+from stomp.exc import StompException
+from stomp.frames import DisconnectFrame
+from stomp.transport.connection import Connection
+from stomp.transport.endpoints import EndpointSet
+from stomp.transport.heartbeat import Heartbeat
+from stomp.aio.receiptmanager import AsyncReceiptManager
+from stomp.aio.session import AsyncSession
+
+
+class AsyncConnection(asyncio.Protocol):
+    """Manages the connection to the ``STOMP`` server on an :mod:`asyncio`
+    event loop. This is the :mod:`asyncio` counterpart of
+    :class:`~stomp.transport.connection.Connection`; frames are received by
+    the event loop instead of a dedicated thread and frames that expect a
+    receipt are confirmed through futures.
+    """
+    DiscardFrame = Connection.DiscardFrame
+    EVNT_FRAME_RECV = Connection.EVNT_FRAME_RECV
+    EVNT_FRAME_SENT = Connection.EVNT_FRAME_SENT
+    EVNT_CLOSED = 'closed'
+
+    @property
+    def message_factory(self):
+        return self.settings.message_factory
+
+    @property
+    def error(self):
+        return self._error
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.endpoints = EndpointSet.fromsettings(settings)
+        self.endpoint = None
+        self.codec = Codec()
+        self.parser = self.codec.parser()
+        self.loop = None
+        self.transport = None
+        self.frames = asyncio.Queue()
+
+        self._observers = []
+        self._handlers = {}
+        self._close_handlers = []
+        self._error = None
+        self._paused = False
+        self._paused_by = set()
+        self._drain_waiter = None
+        self._heartbeat = None
+        self.heartbeat = Heartbeat()
+        self._receipt_timeout = 1000
+        self._receipts = AsyncReceiptManager(self)
+
+    def join_destination(self, destinations):
+        """Joins a list of destination using the destination separator
+        specified in the configuration.
+        """
+        return self.settings.dest_separator.join(destinations)\
+            if isinstance(destinations, (list, tuple))\
+            else destinations
+
+    def split_destinations(self, destinations):
+        return destinations.split(self.settings.dest_separator)
+
+    def register_handler(self, command, handler):
+        """Route all received frames with the given `command` to the
+        callable `handler`, instead of adding them to the frame buffer.
+        """
+        self._handlers[command] = handler
+
+    def register_close_handler(self, handler):
+        """Invoke the callable `handler` when the connection is lost."""
+        self._close_handlers.append(handler)
+
+    def register_observer(self, observer):
+        """Notify `observer` of every frame that is sent or received, and
+        when the connection is lost.
+        """
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def notify_observers(self, event, **kwargs):
+        for observer in self._observers:
+            observer.notify(event, **kwargs)
+
+    async def connect(self):
+        """Connect to the remote ``STOMP`` server and return the
+        :class:`~stomp.aio.session.AsyncSession`. If multiple endpoints
+        are configured, they are tried one after another in the order of
+        their health and latency.
+        """
+        self.loop = asyncio.get_running_loop()
+        delay = self.settings.address_delay / 1000.0
+        error = None
+        for endpoint in self.endpoints.ranked():
+            started = time.monotonic()
+            try:
+                if isinstance(endpoint, str):
+                    connecting = self.loop.create_unix_connection(
+                        lambda: self, endpoint)
+                else:
+                    connecting = self.loop.create_connection(lambda: self,
+                        *endpoint, happy_eyeballs_delay=delay)
+                await asyncio.wait_for(connecting,
+                    self.settings.connect_timeout / 1000.0)
+            except (EnvironmentError, asyncio.TimeoutError) as e:
+                self.endpoints.failed(endpoint)
+                error = e
+                continue
+            break
+        else:
+            raise error
+        self.endpoint = endpoint
+        self.send_frame(Connection.get_connect_frame(self.settings))
+        response = await self.recv_frame(2500)
+        self.endpoints.succeeded(endpoint, time.monotonic() - started)
+        session = AsyncSession.fromframe(self, response)
+        self.heartbeat = Heartbeat.negotiate(self.settings, session.send_hb,
+            session.recv_hb)
+        self._schedule_heartbeat()
+        return session
+
+    async def recv_frame(self, timeout=None):
+        """Receive one frame that was not handled by an observer."""
+        if timeout is not None:
+            timeout = timeout / 1000.0
+        frame = await asyncio.wait_for(self.frames.get(), timeout)
+        if frame is None:
+            raise self._error
+        return frame
+
+    def send_frame(self, frame, wait=True):
+        """Send a ``STOMP`` frame, represented as a :class:`
+        ~stomp.frames.Frame` instance, to the remote server. Return a
+        future that is resolved when the server confirmed the frame, or
+        immediately if the frame does not expect a receipt. Sending never
+        waits for the receipt, so `wait` is ignored; it is accepted for
+        compatibility with :meth:`stomp.transport.connection.Connection.
+        send_frame`.
+        """
+        self.notify_observers(self.EVNT_FRAME_SENT, frame=frame)
+        raw = self.codec.encode_segments(*frame)
+        receipt_id = frame.receipt_id if frame.expects_receipt() else None
+        return self.send_encoded(raw, receipt_id)
+
+    def send_frames(self, frames):
+        """Send multiple ``STOMP`` frames with a single write. Only a
+        receipt requested by the last frame is tracked; since the server
+        processes frames in order, it confirms the complete batch. See
+        :meth:`send_frame`.
+        """
+        raw = []
+        frame = None
+        for frame in frames:
+            self.notify_observers(self.EVNT_FRAME_SENT, frame=frame)
+            raw.extend(self.codec.encode_segments(*frame))
+        if frame is None:
+            future = self.loop.create_future()
+            future.set_result(None)
+            return future
+        receipt_id = frame.receipt_id if frame.expects_receipt() else None
+        return self.send_encoded(raw, receipt_id)
+
+    def send_encoded(self, raw, receipt_id=None):
+        """Send an encoded ``STOMP`` frame to the remote server. See
+        :meth:`send_frame`.
+        """
+        if self._error is not None:
+            raise self._error
+        if receipt_id is not None:
+            future = self._receipts.expect(receipt_id, self._receipt_timeout)
+        else:
+            future = self.loop.create_future()
+            future.set_result(None)
+        self.send(raw)
+        return future
+
+    def send(self, seq):
+        """Send a byte-sequence, or a list of byte-sequences, to the remote
+        server.
+        """
+        if isinstance(seq, list):
+            self.transport.writelines(seq)
+        else:
+            self.transport.write(seq)
+        self.heartbeat.sent()
+
+    async def drain(self):
+        """Wait until the transport's write buffer is below its high-water
+        mark.
+        """
+        if self._error is not None:
+            raise self._error
+        if not self._paused:
+            return
+        self._drain_waiter = self.loop.create_future()
+        await self._drain_waiter
+
+    async def close(self):
+        """Sends the ``DISCONNECT`` frame to the ``STOMP`` server and closes
+        the transport.
+        """
+        if self.transport is None or self._error is not None:
+            return
+        self.send_frame(DisconnectFrame())
+        self.transport.close()
+
+    def pause_reading(self, consumer):
+        """Stop reading from the transport until :meth:`resume_reading`
+        is invoked for `consumer`.
+        """
+        if not self._paused_by and not self.transport.is_closing():
+            self.transport.pause_reading()
+        self._paused_by.add(consumer)
+
+    def resume_reading(self, consumer):
+        """Resume reading from the transport if no other consumer paused
+        it.
+        """
+        if consumer not in self._paused_by:
+            return
+        self._paused_by.discard(consumer)
+        if not self._paused_by and not self.transport.is_closing():
+            self.transport.resume_reading()
+
+            # Allow the server a full grace period again and schedule the
+            # liveness check that was suspended while reading was paused.
+            self.heartbeat.received()
+            if self._heartbeat is not None:
+                self._heartbeat.cancel()
+            self._schedule_heartbeat()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info('socket')
+        if sock is not None:
+            Connection.configure_socket(self.settings, sock)
+
+    def data_received(self, data):
+        self.heartbeat.received()
+        self.parser.feed(data)
+        try:
+            for frame in self.parser:
+                if frame.is_error():
+                    raise StompException.fromframe(frame)
+                if self._observers:
+                    try:
+                        self.notify_observers(self.EVNT_FRAME_RECV,
+                            frame=frame)
+                    except self.DiscardFrame:
+                        continue
+                handler = self._handlers.get(frame.command)
+                if handler is not None:
+                    handler(frame)
+                    continue
+                self.frames.put_nowait(frame)
+        except FatalException as e:
+            self._error = e
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        if self._error is None:
+            self._error = ConnectionLost(exc or "Connection closed.")
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        self.frames.put_nowait(None)
+        for handler in self._close_handlers:
+            handler()
+        self.notify_observers(self.EVNT_CLOSED, frame=None)
+        self.resume_writing()
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        waiter, self._drain_waiter = self._drain_waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _schedule_heartbeat(self):
+        # Send a newline to satisfy the servers' heartbeat expectations,
+        # unless other data was sent within the interval, and close the
+        # connection if the server did not send data within the grace
+        # period.
+        self._heartbeat = None
+        if self.heartbeat.is_dead() and not self._paused_by:
+            self._error = ConnectionLost("The server did not send a heartbeat.")
+            self.transport.close()
+            return
+        if self.heartbeat.must_send():
+            self.send(b'\n')
+        timeout = self.heartbeat.send_timeout() if self._paused_by\
+            else self.heartbeat.timeout()
+        if timeout is not None:
+            self._heartbeat = self.loop.call_later(timeout,
+                self._schedule_heartbeat)
@@ -0,0 +1,49 @@
+from stomp.const import RECEIPT
+from stomp.exc import FrameNotConfirmed
+
+
+class AsyncReceiptManager(object):
+    """Resolves futures for frames that expect a receipt when the
+    ``RECEIPT`` frame arrives.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        connection.register_handler(RECEIPT, self.receipt_received)
+        connection.register_close_handler(self.connection_lost)
+        self.receipts = {}
+
+    def expect(self, receipt_id, timeout=None):
+        """Return a future that is resolved when the ``RECEIPT`` frame for
+        `receipt_id` is received, or fails with :exc:`FrameNotConfirmed`
+        after `timeout` milliseconds.
+        """
+        loop = self.connection.loop
+        future = self.receipts[receipt_id] = loop.create_future()
+        if timeout is not None:
+            handle = loop.call_later(timeout / 1000.0, self._expire, receipt_id)
+            future.add_done_callback(lambda f: handle.cancel())
+        return future
+
+    def fail(self, exception):
+        """Fail all outstanding futures with `exception`."""
+        receipts, self.receipts = self.receipts, {}
+        for future in receipts.values():
+            if not future.done():
+                future.set_exception(exception)
+
+    def receipt_received(self, frame):
+        """Resolve the future of the frame for which the ``RECEIPT`` frame
+        `frame` was sent.
+        """
+        future = self.receipts.pop(frame.receipt_id, None)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    def connection_lost(self):
+        self.fail(self.connection.error)
+
+    def _expire(self, receipt_id):
+        future = self.receipts.pop(receipt_id, None)
+        if future is not None and not future.done():
+            future.set_exception(FrameNotConfirmed(receipt_id))
@@ -0,0 +1,60 @@
+import uuid
+
+from stomp.const import HDR_DESTINATION
+from stomp.frames import SubscribeFrame
+from stomp.transport.session import Session
+from stomp.aio.subscriptions import AsyncSubscriptionManager
+
+
+class AsyncSession(Session):
+    """A :class:`~stomp.transport.session.Session` on an :mod:`asyncio`
+    event loop.
+    """
+    subscription_manager_class = AsyncSubscriptionManager
+
+    #: Options of :meth:`stomp.transport.session.Session.subscribe` that
+    #: rely on threads and are not supported on an event loop.
+    unsupported_options = ('handler', 'workers', 'order_key', 'max_pending',
+        'processes', 'ack_batch', 'ack_interval')
+
+    async def subscribe(self, destinations, **kwargs):
+        """Subscribe to the specified `destination` and wait until the
+        server confirmed the subscription. See
+        :meth:`stomp.transport.session.Session.subscribe`; the options
+        in :attr:`unsupported_options` raise :exc:`TypeError`.
+
+        Returns:
+            :class:`~stomp.aio.subscriptions.AsyncSubscription`
+        """
+        unsupported = [k for k in self.unsupported_options if k in kwargs]
+        if unsupported:
+            raise TypeError("Unsupported subscription options: {0}".format(
+                ", ".join(unsupported)))
+        if not isinstance(destinations, list):
+            destinations = [destinations]
+
+        sid = kwargs.pop('_sid', uuid.uuid4().hex)
+        prefetch = kwargs.pop('prefetch', None)
+        low_water = kwargs.pop('low_water', None)
+        dedup_window = kwargs.pop('dedup_window', 1000)
+        dedup_max_age = kwargs.pop('dedup_max_age', None)
+        headers = self.get_subscription_headers(sid, destinations,
+            prefetch=prefetch, **kwargs)
+        frame = SubscribeFrame(list(headers.items()), with_receipt=True)
+
+        # Register the subscription before sending the frame, because
+        # messages may arrive before the receipt.
+        sub = self.subscriptions.add(sid, destinations, prefetch=prefetch,
+            low_water=low_water, dedup_window=dedup_window,
+            dedup_max_age=dedup_max_age, headers=headers)
+        try:
+            await self.connection.send_frame(frame)
+        except Exception:
+            self.subscriptions.discard(sid)
+            raise
+
+        _ = (sid, frame.headers[HDR_DESTINATION])
+        self.logger.info(
+            "Subscribed to {1} (id={0})".format(*_))
+
+        return sub
@@ -0,0 +1,83 @@
+import asyncio
+
+from stomp.transport.subscriptions import Subscription
+from stomp.transport.subscriptions import SubscriptionManager
+
+
+class AsyncSubscription(Subscription):
+    """A :class:`~stomp.transport.subscriptions.Subscription` of which the
+    messages can be consumed with ``async for``.
+    """
+
+    @property
+    def messages(self):
+        """Return all messages received by this subscription."""
+        while True:
+            try:
+                msg = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if msg is None:
+                self.queue.put_nowait(None)
+                break
+            self._consumed()
+            yield msg
+
+    def __init__(self, manager, sid, destinations, **kwargs):
+        super(AsyncSubscription, self).__init__(manager, sid, destinations,
+            **kwargs)
+        self.queue = asyncio.Queue()
+
+    async def get(self):
+        """Wait for the next message. Return ``None`` if the subscription
+        was destroyed or the connection was closed.
+        """
+        msg = await self.queue.get()
+        if msg is None:
+            # Let other consumers see the end of the subscription as well.
+            self.queue.put_nowait(None)
+        else:
+            self._consumed()
+        return msg
+
+    def close(self):
+        self.queue.put_nowait(None)
+
+    def _consumed(self):
+        if self.prefetch and self.queue.qsize() <= self.low_water:
+            self.manager.connection.resume_reading(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        msg = await self.get()
+        if msg is None:
+            raise StopAsyncIteration
+        return msg
+
+
+class AsyncSubscriptionManager(SubscriptionManager):
+    subscription_class = AsyncSubscription
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncSubscriptionManager, self).__init__(*args, **kwargs)
+        self.connection.register_close_handler(self.connection_lost)
+
+    def destroy(self, sid):
+        """Destroy the :class:`AsyncSubscription` identified by `sid` and
+        return a future that is resolved when the server confirmed the
+        ``UNSUBSCRIBE`` frame.
+        """
+        sub = self.subscriptions.get(sid)
+        future = super(AsyncSubscriptionManager, self).destroy(sid)
+        if sub is not None:
+            sub.close()
+        if future is None:
+            future = self.connection.loop.create_future()
+            future.set_result(None)
+        return future
+
+    def connection_lost(self):
+        for sub in self.subscriptions.values():
+            sub.close()
@@ -0,0 +1,56 @@
+from stomp.transport.transport import Transport
+from stomp.aio.connection import AsyncConnection
+
+
+class AsyncTransport(Transport):
+    """The :mod:`asyncio` counterpart of
+    :class:`~stomp.transport.transport.Transport`. All methods that
+    communicate with the server are coroutines.
+    """
+    connection_class = AsyncConnection
+
+    async def start(self):
+        """Connects to the ``STOMP`` server and starts the transport."""
+        self.session = await self.connection.connect()
+
+    async def stop(self):
+        """Stop the transport and disconnect from the server."""
+        await self.connection.close()
+
+    async def subscribe(self, destinations, **opts):
+        """Subscribes to the specified destinations. See
+        :meth:`stomp.transport.transport.Transport.subscribe`.
+
+        Returns:
+            :class:`~stomp.aio.subscriptions.AsyncSubscription`
+        """
+        return await self.session.subscribe(destinations, **opts)
+
+    async def unsubscribe_all(self):
+        """Send an ``UNSUBSRCIBE`` frame for all subscriptions."""
+        for sub in list(self.session):
+            await sub.destroy()
+
+    async def send(self, destinations, content_type, body, headers=None,
+        receipt=False):
+        """Send a message to `destinations`. If `receipt` is ``True``, wait
+        until the server confirmed the frame.
+        """
+        await self.connection.drain()
+        await super(AsyncTransport, self).send(destinations, content_type,
+            body, headers=headers, receipt=receipt)
+
+    async def send_many(self, messages, receipt=False):
+        """Send multiple messages with a single write. See
+        :meth:`stomp.transport.transport.Transport.send_many`.
+        """
+        await self.connection.drain()
+        await super(AsyncTransport, self).send_many(messages,
+            receipt=receipt)
+
+    def producer(self, linger=5, max_bytes=65536):
+        """Not supported on an event loop, since the producer flushes its
+        batches from a background thread; use :meth:`send_many` instead.
+        """
+        raise NotImplementedError(
+            "AsyncTransport does not support producers; use send_many().")
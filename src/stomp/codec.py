@@ -1,21 +1,42 @@
 import collections
-import copy
-import functools
-import operator
+import re
 
+from stomp.compat import buffer_types
 from stomp.const import *
 from stomp.exc import MalformedFrame
 from stomp.exc import InvalidCommandType
 from stomp.frames import Frame
 
 
+ESCAPES = {
+    BS: ESC + BS,
+    CR: ESC + chr(114),
+    LF: ESC + chr(110),
+    COL: ESC + chr(99)
+}
+UNESCAPES = dict((v, k) for k, v in ESCAPES.items())
+
+ESCAPE = re.compile(r'[\\\r\n:]')
+ESCAPE_RAW = re.compile(r'\\')
+UNESCAPE = re.compile(r'\\[\\rnc]')
+UNESCAPE_RAW = re.compile(r'\\\\')
+
+
+def _escape(match):
+    return ESCAPES[match.group()]
+
+
+def _unescape(match):
+    return UNESCAPES[match.group()]
+
+
 class Codec(object):
     """Encodes and decodes ``STOMP`` frames."""
     encoding = "utf-8"
 
     def __init__(self, eol=None):
-        self.eol = ((CR+LF) if (eol==CR) else LF)\
-            .encode(self.encoding)
+        self._eol = (CR+LF) if (eol==CR) else LF
+        self.eol = self._eol.encode(self.encoding)
 
     def consume_buffer(self, buf):
         """Consume all frames in a file-like object until EOF is
@@ -34,6 +55,55 @@ class Codec(object):
         decoder = Decoder(self, buf)
         return decoder.decode()
 
+    def parser(self):
+        """Return a new :class:`FrameParser` using this :class:`Codec`."""
+        return FrameParser(self)
+
+    def parse_head(self, raw):
+        """Parse the command and header lines of a ``STOMP`` frame.
+
+        Args:
+            raw: a string holding the command line and the header lines,
+                without the empty line that terminates the header block.
+
+        Returns:
+            tuple: the command, a list of key/value pairs and the value of the
+                ``content-length`` header as an integer, or ``None`` if the
+                header was not specified.
+        """
+        lines = raw.split(LF)
+        command = lines[0].rstrip(CR)
+        if command not in FRAME_TYPES:
+            raise InvalidCommandType("Not a STOMP command: " + command)
+
+        headers = collections.OrderedDict()
+        for pair in lines[1:]:
+            # Carriage return is optional, so we strip it here.
+            pair = pair.rstrip(CR)
+            if not pair:
+                continue
+            key, _, val = pair.partition(COL)
+            key = self.unescape(command, key)
+
+            # If a client or a server receives repeated frame header entries,
+            # only the first header entry SHOULD be used as the value of
+            # header entry.
+            if key in headers:
+                continue
+            headers[key] = self.unescape(command, val)
+
+        content_length = None
+        if HDR_CONTENT_LENGTH in headers:
+            l = headers[HDR_CONTENT_LENGTH]
+            try:
+                content_length = int(l)
+            except ValueError:
+                raise MalformedFrame("Malformed `content-length` header: " + l)
+            if content_length < 0:
+                raise MalformedFrame("Malformed `content-length` header: " + l)
+
+        return command, list(headers.items()), content_length
+
     def encode(self, command, headers, body=None, encode=False):
         """Encode a ``STOMP`` frame.
 
@@ -46,28 +116,49 @@ class Codec(object):
                 for ``MESSAGE`` frames.
 
         Returns:
-            str
+            bytes
+        """
+        return b''.join(self.encode_segments(command, headers, body))
+
+    def encode_segments(self, command, headers, body=None):
+        """Like :meth:`encode`, but return the encoded frame as a list of
+        buffers that can be passed to :meth:`socket.socket.sendmsg`. The
+        body is included as-is, so it is not copied if it already is a
+        byte-sequence.
         """
-        headers = copy.deepcopy(headers)
         if command not in FRAME_TYPES:
             raise InvalidCommandType("Not a STOMP command: " + command)
-        nodes = [command.encode(self.encoding)]
+        if body is not None and not isinstance(body, buffer_types):
+            body = body.encode(self.encoding)
 
-        if bool(body):
+        lines = [command]
+        if body:
             assert command in (SEND, MESSAGE, ERROR)
-            headers.insert(0, ['content-length', str(len(body))])
+            lines.append(HDR_CONTENT_LENGTH + COL + str(len(body)))
 
+        escape = self._escape
         for key, value in headers:
-            nodes.extend([self.eol, self.encode_header(command, key, value)])
-
-        nodes.extend([self.eol, self.eol])
-        if body is not None:
-            if not isinstance(body, bytes):
-                body = body.encode(self.encoding)
-            nodes.append(body)
-
-        nodes.append(NULL.encode(self.encoding))
-        return functools.reduce(operator.add, nodes)
+            lines.append(escape(command, key) + COL + escape(command, value))
+
+        lines.extend(['', ''])
+        head = self._eol.join(lines).encode(self.encoding)
+        if not body:
+            return [head + b'\x00']
+        return [head, body, b'\x00']
+
+    def encode_head(self, command, headers):
+        """Encode the command line and header lines of a ``STOMP`` frame.
+        The returned byte-sequence does not include the empty line that
+        terminates the header block, so that more headers may be appended.
+        """
+        if command not in FRAME_TYPES:
+            raise InvalidCommandType("Not a STOMP command: " + command)
+        lines = [command]
+        escape = self._escape
+        for key, value in headers:
+            lines.append(escape(command, key) + COL + escape(command, value))
+        lines.append('')
+        return self._eol.join(lines).encode(self.encoding)
 
     def encode_header(self, command, key, value):
         """Encode the header for a ``STOMP`` frame."""
@@ -92,118 +183,235 @@ class Codec(object):
         # - \\ (octet 92 and 92) translates to \ (octet 92)
         #
         # (STOMP 1.2 specification)
-        value = value.replace(BS, BS + BS)
-        if command not in [CONNECT, CONNECTED]:
-            value = value\
-                .replace(CR, ESC + chr(114))\
-                .replace(LF, ESC + chr(110))\
-                .replace(COL, ESC + chr(99))
-
-        return value
+        #
+        # Most values do not contain any of these octets, so they are only
+        # substituted (in a single pass) if the value needs escaping.
+        pattern = ESCAPE_RAW if command in (CONNECT, CONNECTED) else ESCAPE
+        if pattern.search(value) is None:
+            return value
+        return pattern.sub(_escape, value)
 
     def unescape(self, command, value):
-        if command not in [CONNECT, CONNECTED]:
-            value = value.replace(ESC + chr(114), CR)\
-                .replace(ESC + chr(110), LF)\
-                .replace(ESC + chr(99), COL)
-
-        return value.replace(ESC + BS, BS)
+        if ESC not in value:
+            return value
+        pattern = UNESCAPE_RAW if command in (CONNECT, CONNECTED) else UNESCAPE
+        return pattern.sub(_unescape, value)
+
+
+def find_head(buf, start, end):
+    """Locate the empty line terminating the header block of a frame in
+    `buf`, searching from `start` up to `end`. Return a tuple holding the
+    offset of the end of the header block and the offset of the body, or
+    ``None`` if the header block is not terminated.
+    """
+    # Carriage returns are optional, so the empty line is either a
+    # single LF or CRLF.
+    i = buf.find(b'\n\n', start, end)
+    j = buf.find(b'\n\r\n', start, (i + 3) if i >= 0 else end)
+    if j >= 0:
+        return j, j + 3
+    if i >= 0:
+        return i, i + 2
+    return None
 
 
 class Decoder(object):
+    chunk_size = 4096
 
     def __init__(self, codec, buf):
         self.buf = buf
         self.content_length = None
         self.command = ''
         self.body = b''
-        self.raw_headers = ''
-        self.eol_count = 0
         self.headers = []
         self.codec = codec
 
     def decode(self):
         """Decodes a ``STOMP`` frame contained in :attr:`Decoder.buf`."""
-        # If the buffer starts with a newline, we **probably**
-        # have either, reached the end of the stream or received
-        # a buffer with one or more heartbeats preceding the frame.
-        octet_prime = self.buf.read(1).decode(self.codec.encoding)
-        while octet_prime == LF:
-            octet_prime = self.buf.read(1).decode(self.codec.encoding)
-
-        if not octet_prime:
-            raise EOFError
-
-        self.buf.seek(self.buf.tell() - 1)
+        offset = self.buf.tell()
+        data = self.buf.read(self.chunk_size)
+        pos = scan = 0
         while True:
-            octet = self.buf.read(1).decode(self.codec.encoding)
-            if not octet:
-                break
-            if octet == LF:
-                break
-            if octet == CR:
-                continue
-            self.command += octet
-
-        if self.command not in FRAME_TYPES:
-            raise InvalidCommandType("Not a STOMP command: " + self.command)
+            # If the buffer starts with a newline, we **probably**
+            # have either, reached the end of the stream or received
+            # a buffer with one or more heartbeats preceding the frame.
+            while data[pos:pos+1] in (b'\n', b'\r'):
+                pos += 1
+            if pos < len(data):
+                head = find_head(data, max(scan, pos), len(data))
+                if head is not None:
+                    break
 
-        # Read the buffer until we encounter two EOLs. This is where
-        # the message body starts.
-        while True:
-            octet = self.buf.read(1).decode(self.codec.encoding)
-            if not octet:
+            # The header block was not terminated, so read more data.
+            chunk = self.buf.read(len(data) or self.chunk_size)
+            if not chunk:
+                if pos == len(data):
+                    raise EOFError
                 raise MalformedFrame("Unexpected end of byte-stream.")
+            scan = max(len(data) - 2, 0)
+            data += chunk
 
-            if self.raw_headers and (self.raw_headers[-1] == LF) and (octet == LF):
-                break
-
-            if octet == CR:
-                continue
+        head_end, body_start = head
+        self.command, self.headers, self.content_length =\
+            self.codec.parse_head(data[pos:head_end].decode(self.codec.encoding))
 
-            self.raw_headers += octet
+        # The body is read from the underlying buffer in one operation so
+        # that it is copied only once.
+        self.buf.seek(offset + body_start)
+        if self.content_length is not None:
+            self.body = self.buf.read(self.content_length)
+            if len(self.body) < self.content_length:
+                raise MalformedFrame("Unexpected end of byte-stream.")
+            if self.buf.read(1) != b'\x00':
+                raise MalformedFrame("Frame body too large.")
+        else:
+            chunks = []
+            size = self.chunk_size
+            while True:
+                chunk = self.buf.read(size)
+                if not chunk:
+                    raise MalformedFrame("Unexpected end of byte-stream.")
+                body_end = chunk.find(b'\x00')
+                if body_end >= 0:
+                    chunks.append(chunk[:body_end])
+                    break
+                chunks.append(chunk)
+                size *= 2
+            self.body = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+            self.buf.seek(offset + body_start + len(self.body) + 1)
 
-        self._parse_headers()
-        self._parse_body()
         return self.command, self.headers, self.body
 
-    def _parse_headers(self):
-        headers = collections.OrderedDict()
-        f = functools.partial(self.codec.unescape, self.command)
-        for pair in filter(bool, self.raw_headers.split(LF)):
-            # Carriage return is optional, so we strip it here.
-            key, val = map(f, pair.rstrip(CR).split(':'))
 
-            # If a client or a server receives repeated frame header entries,
-            # only the first header entry SHOULD be used as the value of
-            # header entry. Subsequent values are only used to maintain a
-            # history of state changes of the header and MAY be ignored.
-            if key in headers:
-                continue
+class FrameParser(object):
+    """Incrementally parses ``STOMP`` frames from a byte-stream that is
+    received in chunks of arbitrary size.
 
-            headers[key] = val
+    Received octets are written into a reusable buffer, either by
+    :meth:`feed` or directly from a socket using :meth:`recv_into`.
+    Iterating over the parser yields all complete frames; partial
+    frames are kept in the buffer until the remaining octets arrive.
+    """
 
-        if 'content-length' in headers:
-            try:
-                l = headers['content-length']
-                self.content_length = int(l)
-            except Exception:
-                raise MalformedFrame("Malformed `content-length` header: " + l)
+    def __init__(self, codec, size=4096):
+        self.codec = codec
+        self.buf = bytearray(size)
+        self.start = 0
+        self.end = 0
 
-        delattr(self, 'raw_headers')
-        self.headers = list([tuple(x) for x in headers.items()])
+        # State of a frame of which the header block was parsed, but
+        # of which the body was not completely received.
+        self._head = None
+        self._scan = 0
 
-    def _parse_body(self):
-        if self.content_length:
-            self.body = self.buf.read(self.content_length)
-            octet = self.buf.read(1).decode(self.codec.encoding)
-            if octet != NULL:
+    def __len__(self):
+        return self.end - self.start
+
+    def reserve(self, n):
+        """Ensure that at least `n` octets can be written to the buffer
+        without overwriting unparsed data.
+        """
+        if (len(self.buf) - self.end) >= n:
+            return
+
+        # Move the unparsed data to the start of the buffer. All offsets
+        # that are tracked relative to the buffer are adjusted.
+        offset = self.start
+        if offset:
+            pending = self.end - offset
+            self.buf[:pending] = self.buf[offset:self.end]
+            self.start = 0
+            self.end = pending
+            self._scan = max(self._scan - offset, 0)
+            if self._head is not None:
+                command, headers, body_start, content_length = self._head
+                self._head = (command, headers, body_start - offset,
+                    content_length)
+
+        size = len(self.buf)
+        while (size - self.end) < n:
+            size *= 2
+        if size > len(self.buf):
+            self.buf.extend(bytes(size - len(self.buf)))
+
+    def feed(self, data):
+        """Append the octets in `data` to the buffer."""
+        n = len(data)
+        self.reserve(n)
+        self.buf[self.end:self.end+n] = data
+        self.end += n
+
+    def recv_into(self, recv_into, n):
+        """Read at most `n` octets into the buffer using the `recv_into`
+        callable, which has the same signature as
+        :meth:`socket.socket.recv_into`. Return the number of octets
+        read.
+        """
+        self.reserve(n)
+        view = memoryview(self.buf)
+        try:
+            count = recv_into(view[self.end:self.end+n], n)
+        finally:
+            view.release()
+        self.end += count
+        return count
+
+    def next_frame(self):
+        """Return the next complete frame from the buffer, or ``None`` if
+        the buffer does not hold a complete frame.
+        """
+        buf = self.buf
+        if self._head is None:
+            # Skip any heartbeats preceding the frame.
+            pos = self.start
+            while pos < self.end and buf[pos] in (10, 13):
+                pos += 1
+            self.start = pos
+            if pos == self.end:
+                self.start = self.end = self._scan = 0
+                return None
+
+            head = find_head(buf, max(self._scan, pos), self.end)
+            if head is None:
+                self._scan = max(self.end - 2, pos)
+                return None
+            head_end, body_start = head
+
+            raw = buf[pos:head_end].decode(self.codec.encoding)
+            command, headers, content_length = self.codec.parse_head(raw)
+            self._head = (command, headers, body_start, content_length)
+            self._scan = body_start
+
+        command, headers, body_start, content_length = self._head
+        if content_length is not None:
+            # Jump straight to the end of the body if the size of the body
+            # is known.
+            body_end = body_start + content_length
+            if self.end <= body_end:
+                return None
+            if buf[body_end] != 0:
                 raise MalformedFrame("Frame body too large.")
         else:
-            while True:
-                octet = self.buf.read(1)
-                if not octet or (octet.decode(self.codec.encoding) == NULL):
-                    break
-                self.body += octet
-
-
+            body_end = buf.find(b'\x00', self._scan, self.end)
+            if body_end < 0:
+                self._scan = self.end
+                return None
+
+        view = memoryview(buf)
+        try:
+            body = view[body_start:body_end].tobytes()
+        finally:
+            view.release()
+
+        self._head = None
+        self.start = self._scan = body_end + 1
+        if self.start == self.end:
+            self.start = self.end = self._scan = 0
+        return Frame(command, headers, body)
+
+    def __iter__(self):
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                break
+            yield frame
@@ -3,7 +3,11 @@ from collections import namedtuple
 
 Settings = namedtuple('Settings', ['host','port','vhost','username',
     'password','send_hb','recv_hb','path_separator','dest_separator',
-    'queue_prefix','topic_prefix','dsub_prefix','message_factory'])
+    'queue_prefix','topic_prefix','dsub_prefix','message_factory',
+    'receipt_window','heartbeat_grace','reconnect','reconnect_delay',
+    'reconnect_max_delay','reconnect_attempts','reconnect_buffer',
+    'endpoints','endpoint_delay','connect_timeout','address_delay',
+    'tcp_nodelay','rcvbuf','sndbuf','keepalive'])
 
 
 def settings_factory(**kwargs):
@@ -17,4 +21,54 @@ def settings_factory(**kwargs):
     kwargs.setdefault('topic_prefix', '/topic/')
     kwargs.setdefault('dsub_prefix', '/dsub/')
     kwargs.setdefault('message_factory', None)
+
+    # The maximum number of frames awaiting a receipt. If set, frames
+    # that expect a receipt are pipelined instead of confirmed one by one.
+    kwargs.setdefault('receipt_window', 0)
+
+    # The server is considered dead if it did not send data for this
+    # number of times the negotiated heartbeat interval.
+    kwargs.setdefault('heartbeat_grace', 2.0)
+
+    # If reconnect is enabled, a lost connection is reestablished after
+    # a delay that starts at reconnect_delay milliseconds and doubles
+    # after each failed attempt, up to reconnect_max_delay. Zero attempts
+    # means that the client keeps trying. Publishers may queue up to
+    # reconnect_buffer bytes in the meantime.
+    kwargs.setdefault('reconnect', False)
+    kwargs.setdefault('reconnect_delay', 100)
+    kwargs.setdefault('reconnect_max_delay', 30000)
+    kwargs.setdefault('reconnect_attempts', 0)
+    kwargs.setdefault('reconnect_buffer', 1 << 20)
+
+    # A list of broker endpoints, as (host, port) tuples, 'host:port'
+    # strings or 'unix:///path' strings for Unix domain sockets, used
+    # instead of host and port. A Unix domain socket may also be
+    # specified as host, without port. The endpoints are connected
+    # to in parallel, starting endpoint_delay milliseconds apart in the
+    # order of their recent handshake latencies, and the first one that
+    # completes the handshake is used.
+    kwargs.setdefault('endpoints', None)
+    kwargs.setdefault('endpoint_delay', 250)
+
+    # The addresses of a host are connected to concurrently, alternating
+    # between IPv6 and IPv4 and starting address_delay milliseconds
+    # apart. Connecting fails if no address accepted the connection
+    # within connect_timeout milliseconds.
+    kwargs.setdefault('connect_timeout', 10000)
+    kwargs.setdefault('address_delay', 250)
+
+    # Socket options. Nagle's algorithm is disabled by default, so that
+    # small frames are not delayed. The buffer sizes default to the
+    # system settings. keepalive enables TCP keepalive probes; it may be
+    # an (idle, interval, count) tuple holding the number of seconds
+    # before the first probe, the seconds between probes and the number
+    # of unanswered probes after which the connection is dropped.
+    kwargs.setdefault('tcp_nodelay', True)
+    kwargs.setdefault('rcvbuf', None)
+    kwargs.setdefault('sndbuf', None)
+    kwargs.setdefault('keepalive', False)
+    if kwargs['endpoints']:
+        kwargs.setdefault('host', None)
+        kwargs.setdefault('port', None)
     return Settings(**kwargs)
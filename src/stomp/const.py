@@ -59,3 +59,7 @@ HDR_RECEIPT = 'receipt'
 HDR_RECEIPT_ID = 'receipt-id'
 HDR_SUBSCRIPTION = 'subscription'
 HDR_VERSION = 'version'
+
+# Broker-specific prefetch headers, sent with SUBSCRIBE frames when a
+# prefetch limit is specified.
+HDR_PREFETCH = ('activemq.prefetchSize', 'prefetch-count')
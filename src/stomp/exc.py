@@ -12,6 +12,10 @@ class MalformedFrame(FatalException):
     pass
 
 
+class ConnectionLost(FatalException):
+    pass
+
+
 class StompException(FatalException):
 
     @classmethod
@@ -1,4 +1,6 @@
 import functools
+import sys
+import types
 import uuid
 
 from stomp.const import ACK
@@ -12,7 +14,13 @@ from stomp.const import HDR_RECEIPT_ID
 
 
 class Frame(object):
-    """The base class for all ``STOMP`` frames."""
+    """The base class for all ``STOMP`` frames.
+
+    The headers are kept as a list of key/value pairs, in the order they
+    are encoded. A read-only mapping of the headers is built when they
+    are first looked up and cached until a header is added.
+    """
+    __slots__ = ('__command', '__headers', '__body', '__index')
 
     @property
     def receipt_id(self):
@@ -43,7 +51,10 @@ class Frame(object):
 
     @property
     def headers(self):
-        return dict(self.__headers)
+        index = self.__index
+        if index is None:
+            index = self.__index = types.MappingProxyType(dict(self.__headers))
+        return index
 
     @property
     def command(self):
@@ -58,9 +69,10 @@ class Frame(object):
         return functools.partial(cls, command)
 
     def __init__(self, command, headers=None, body=None, with_receipt=False):
-        self.__command = command
+        self.__command = sys.intern(command)
         self.__headers = headers or []
         self.__body = body
+        self.__index = None
         if with_receipt:
             self.__headers.append([HDR_RECEIPT, uuid.uuid4().hex])
 
@@ -86,9 +98,14 @@ class Frame(object):
 
     def set_header(self, name, value):
         self.__headers.append((name, value))
+        self.__index = None
 
     def __iter__(self):
         return iter((self.__command, self.__headers, self.__body))
 
+    def __reduce__(self):
+        # The cached header index can not be pickled.
+        return (type(self), (self.__command, self.__headers, self.__body))
+
     def __repr__(self):
         return "<Frame: {0}>".format(self.__command)
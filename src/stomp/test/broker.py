@@ -0,0 +1,172 @@
+import collections
+import itertools
+import os
+import socket
+import threading
+
+from stomp.codec import Codec
+from stomp.const import CONNECT
+from stomp.const import CONNECTED
+from stomp.const import DISCONNECT
+from stomp.const import MESSAGE
+from stomp.const import RECEIPT
+from stomp.const import SEND
+from stomp.const import STOMP
+from stomp.const import SUBSCRIBE
+from stomp.const import UNSUBSCRIBE
+from stomp.const import ACK_AUTO
+from stomp.const import HDR_ACK
+from stomp.const import HDR_DESTINATION
+from stomp.const import HDR_HEARBEAT
+from stomp.const import HDR_ID
+from stomp.const import HDR_MESSAGE_ID
+from stomp.const import HDR_RECEIPT
+from stomp.const import HDR_RECEIPT_ID
+from stomp.const import HDR_SUBSCRIPTION
+from stomp.const import HDR_VERSION
+from stomp.const import STOMP_VERSION
+
+
+class Broker(object):
+    """A minimal ``STOMP`` server used as a stand-in for a real broker in
+    tests. It accepts any login, confirms all frames that request a
+    receipt and delivers ``SEND`` frames to the subscriptions on the
+    destination. It listens on a TCP port, or on a Unix domain socket if
+    `family` is ``AF_UNIX`` and `address` is a path.
+    """
+
+    def __init__(self, family=socket.AF_INET, address=('127.0.0.1', 0),
+        heartbeat=(0, 0), receipts=True):
+        self.codec = Codec()
+        self.heartbeat = heartbeat
+        self.receipts = receipts
+        self.frames = collections.deque()
+        self.clients = []
+        self.subscriptions = collections.defaultdict(list)
+        self.lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        if family != getattr(socket, 'AF_UNIX', None):
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(address)
+        self.listener.listen(64)
+        self.address = self.listener.getsockname()
+        self.thread = threading.Thread(target=self._accept)
+        self.thread.daemon = True
+
+    @property
+    def host(self):
+        return self.address[0]
+
+    @property
+    def port(self):
+        return self.address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop accepting connections and close all client sockets."""
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except EnvironmentError:
+            pass
+        self.listener.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self.drop_clients()
+
+    def drop_clients(self):
+        """Close the sockets of all connected clients."""
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except EnvironmentError:
+                pass
+            client.close()
+
+    def received(self, command=None):
+        """Return all frames received by the broker, optionally filtered by
+        `command`.
+        """
+        return [f for f in list(self.frames)
+            if (command is None) or f.command == command]
+
+    def send(self, client, command, headers, body=None):
+        raw = self.codec.encode(command, headers, body)
+        with self._send_lock:
+            client.sendall(raw)
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except EnvironmentError:
+                break
+            with self.lock:
+                self.clients.append(client)
+            thread = threading.Thread(target=self._serve, args=[client])
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, client):
+        parser = self.codec.parser()
+        try:
+            while True:
+                data = client.recv(65536)
+                if not data:
+                    break
+                parser.feed(data)
+                for frame in parser:
+                    self.frames.append(frame)
+                    self._handle(client, frame)
+        except EnvironmentError:
+            pass
+        finally:
+            with self.lock:
+                for subs in self.subscriptions.values():
+                    subs[:] = [s for s in subs if s[0] is not client]
+
+    def _handle(self, client, frame):
+        headers = frame.headers
+        if frame.command in (CONNECT, STOMP):
+            self.send(client, CONNECTED, [
+                (HDR_VERSION, STOMP_VERSION),
+                (HDR_HEARBEAT, '{0},{1}'.format(*self.heartbeat))
+            ])
+            return
+
+        if frame.command == SUBSCRIBE:
+            with self.lock:
+                for destination in headers[HDR_DESTINATION].split(','):
+                    self.subscriptions[destination].append(
+                        (client, headers[HDR_ID], headers.get(HDR_ACK)))
+        elif frame.command == UNSUBSCRIBE:
+            with self.lock:
+                for subs in self.subscriptions.values():
+                    subs[:] = [s for s in subs if s[1] != headers[HDR_ID]]
+        elif frame.command == SEND:
+            self._deliver(frame)
+
+        if self.receipts and frame.expects_receipt():
+            self.send(client, RECEIPT, [(HDR_RECEIPT_ID, frame.receipt_id)])
+
+        if frame.command == DISCONNECT:
+            client.shutdown(socket.SHUT_RDWR)
+
+    def _deliver(self, frame):
+        headers = [(k, v) for k, v in frame.headers.items()
+            if k not in ('content-length', HDR_RECEIPT)]
+        mid = str(next(self._ids))
+        for destination in frame.headers[HDR_DESTINATION].split(','):
+            with self.lock:
+                subs = list(self.subscriptions[destination])
+            for client, sid, ack_mode in subs:
+                extra = [(HDR_SUBSCRIPTION, sid), (HDR_MESSAGE_ID, mid)]
+                if ack_mode not in (None, ACK_AUTO):
+                    extra.append((HDR_ACK, mid))
+                self.send(client, MESSAGE, headers + extra, frame.body)
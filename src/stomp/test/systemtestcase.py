@@ -1,7 +1,6 @@
 import unittest
 
 from stomp.transport.connection import Connection
-from stomp.transport.receiptmanager import ReceiptManager
 from stomp.test.utils import get_test_settings
 
 
@@ -9,9 +8,7 @@ class SystemTestCase(unittest.TestCase):
 
     def create_connection(self, **params):
         settings = get_test_settings(**params)
-        connection = Connection(settings)
-        ReceiptManager(connection)
-        return connection
+        return Connection(settings)
 
     @classmethod
     def setUpClass(cls):
@@ -23,4 +20,4 @@ class SystemTestCase(unittest.TestCase):
 
     def setUp(self):
         self.connection = Connection(self.settings)
-        self.receipts = ReceiptManager(self.connection)
+        self.receipts = self.connection._receipts
@@ -1,3 +1,5 @@
+import time
+
 from stomp.conf import settings_factory
 
 from stomp.test.const import TEST_HOST
@@ -14,3 +16,28 @@ def get_test_settings(**params):
     params.setdefault('username', TEST_USER)
     params.setdefault('password', TEST_PASSWORD)
     return settings_factory(**params)
+
+
+def get_broker_settings(broker, **params):
+    """Return settings to connect to a :class:`~stomp.test.broker.Broker`."""
+    if isinstance(broker.address, str):
+        params.setdefault('host', 'unix://' + broker.address)
+        params.setdefault('port', None)
+    params.setdefault('host', broker.host)
+    params.setdefault('port', broker.port)
+    params.setdefault('vhost', '/')
+    params.setdefault('username', 'guest')
+    params.setdefault('password', 'guest')
+    return settings_factory(**params)
+
+
+def wait_until(func, timeout=2.0, interval=0.001):
+    """Invoke `func` until it returns a true value or `timeout` seconds
+    passed. Return the last value returned by `func`.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = func()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(interval)
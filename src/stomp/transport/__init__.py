@@ -1 +1,2 @@
 from stomp.transport.transport import Transport
+from stomp.transport.pool import TransportPool
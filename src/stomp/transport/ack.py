@@ -0,0 +1,194 @@
+import collections
+import threading
+import time
+import uuid
+
+from stomp.const import ACK
+from stomp.const import ACK_CLIENT
+from stomp.const import HDR_ACK
+from stomp.const import HDR_ID
+from stomp.const import HDR_RECEIPT
+from stomp.frames import Frame
+
+
+class BatchAcknowledger(object):
+    """Collects the acknowledgements for the messages received by a
+    :class:`~stomp.transport.subscriptions.Subscription` and sends them
+    when `batch` messages are accepted, or when the oldest pending
+    acknowledgement has waited `interval` milliseconds.
+
+    In ``client`` mode an ``ACK`` frame acknowledges all previously
+    received messages. Since messages may be accepted out of order, e.g.
+    by a pool of workers, the deliveries are recorded by :meth:`delivered`
+    and only the last message of the leading run of accepted or rejected
+    messages is acknowledged. In ``client-individual`` mode all ``ACK``
+    frames are written at once and only the last frame requests a
+    receipt, which confirms the complete batch.
+
+    The receipt is not waited for; if the server does not confirm a
+    batch, the error is raised by the next call to :meth:`ack`.
+    """
+    _PENDING, _ACCEPTED, _REJECTED = range(3)
+
+    @property
+    def pending(self):
+        """The number of accepted messages that were not acknowledged
+        yet.
+        """
+        return self._count
+
+    def __init__(self, connection, ack_mode, batch=100, interval=100):
+        self.connection = connection
+        self.cumulative = ack_mode == ACK_CLIENT
+        self.batch = batch
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.batches = 0
+
+        self._ids = []
+        self._delivered = collections.OrderedDict()
+        self._count = 0
+        self._deadline = None
+        self._closed = False
+        self._error = None
+        self.thread = threading.Thread(target=self.__main__)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def delivered(self, msg):
+        """Record that the message `msg` was delivered to the consumer.
+        Only relevant in ``client`` mode.
+        """
+        ack_id = msg.headers.get(HDR_ACK)
+        if self.cumulative and ack_id is not None:
+            with self.lock:
+                self._delivered[ack_id] = self._PENDING
+
+    def ack(self, frame):
+        """Schedule the acknowledgement of the ``MESSAGE`` frame `frame`."""
+        ack_id = frame.headers[HDR_ACK]
+        with self.lock:
+            if self._error is not None:
+                raise self._error
+            if self._closed:
+                raise RuntimeError("BatchAcknowledger is closed.")
+            if not self.cumulative:
+                self._ids.append(ack_id)
+                count = 1
+            elif ack_id in self._delivered:
+                self._delivered[ack_id] = self._ACCEPTED
+                count = self._advance()
+            else:
+                self._ids[:] = [ack_id]
+                count = 1
+            full = self._schedule(count)
+
+        if full:
+            self.flush()
+
+    def reject(self, frame):
+        """Send the ``NACK`` frame for the ``MESSAGE`` frame `frame` and
+        return a future that is resolved when the server confirmed it.
+
+        The pending acknowledgements are sent first. In ``client`` mode,
+        the rejected message stays pending until the ``NACK`` frame is
+        sent, so that no cumulative ``ACK`` frame acknowledges it.
+        """
+        ack_id = frame.headers[HDR_ACK]
+        self.flush()
+        future = self.connection.send_frame(frame.nack, wait=False)
+        if not self.cumulative:
+            return future
+        with self.lock:
+            if ack_id not in self._delivered:
+                return future
+            self._delivered[ack_id] = self._REJECTED
+            full = self._schedule(self._advance())
+        if full:
+            self.flush()
+        return future
+
+    def _advance(self):
+        # Acknowledge the leading run of settled messages up to the last
+        # accepted one. Return the number of accepted messages in the run.
+        count = 0
+        while self._delivered:
+            ack_id, state = next(iter(self._delivered.items()))
+            if state == self._PENDING:
+                break
+            self._delivered.popitem(last=False)
+            if state == self._ACCEPTED:
+                self._ids[:] = [ack_id]
+                count += 1
+        return count
+
+    def _schedule(self, count):
+        # Account for `count` newly accepted messages and start the
+        # interval of the batch. Return a boolean indicating if the batch
+        # is full.
+        if not count:
+            return False
+        self._count += count
+        full = self._count >= self.batch
+        if not full and self._deadline is None:
+            self._deadline = time.monotonic() + self.interval / 1000.0
+            self.condition.notify()
+        return full
+
+    def flush(self):
+        """Acknowledge all pending messages."""
+        with self.flush_lock:
+            with self.lock:
+                ids, self._ids = self._ids, []
+                self._count = 0
+                self._deadline = None
+            if not ids:
+                return
+            frames = [Frame(ACK, [(HDR_ID, x)]) for x in ids]
+            frames[-1].set_header(HDR_RECEIPT, uuid.uuid4().hex)
+            future = self.connection.send_frames(frames, wait=False)
+            future.add_done_callback(self._confirmed)
+            self.batches += 1
+
+    def _confirmed(self, future):
+        error = future.exception()
+        if error is not None:
+            with self.lock:
+                self._error = self._error or error
+
+    def close(self):
+        """Acknowledge all pending messages and stop the background
+        thread.
+        """
+        with self.lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.condition.notify()
+        self.thread.join()
+        self.flush()
+
+    def __main__(self):
+        # Flush the pending acknowledgements when the interval of the
+        # oldest acknowledgement passed.
+        while True:
+            with self.lock:
+                while not self._closed:
+                    if self._deadline is None:
+                        self.condition.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self._closed:
+                    break
+
+            try:
+                self.flush()
+            except Exception as e:
+                with self.lock:
+                    self._error = e
+                break
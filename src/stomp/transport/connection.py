@@ -1,22 +1,30 @@
 import collections
 import errno
-import io
-import select
+import functools
+import itertools
+import logging
+import queue
+import random
+import selectors
 import socket
 import time
 import threading
-try:
-    import queue
-except ImportError:
-    import Queue as queue
+from concurrent import futures
 
 from stomp.codec import Codec
 from stomp.const import ACCEPT_VERSIONS
-from stomp.exc import StompException
+from stomp.const import HDR_HEARBEAT
+from stomp.exc import ConnectionLost
+from stomp.exc import FatalException
 from stomp.exc import FrameNotConfirmed
+from stomp.exc import StompException
 from stomp.frames import Frame
 from stomp.frames import ConnectFrame
 from stomp.frames import DisconnectFrame
+from stomp.transport.endpoints import EndpointSet
+from stomp.transport.endpoints import interleave
+from stomp.transport.endpoints import race
+from stomp.transport.heartbeat import Heartbeat
 from stomp.transport.receiptmanager import ReceiptManager
 from stomp.transport.session import Session
 
@@ -24,6 +32,8 @@ from stomp.transport.session import Session
 class Connection(object):
     """Manages the connection to the ``STOMP`` server."""
     buf_size = 1024
+    max_buf_size = 1 << 18
+    iov_max = 1024
     DiscardFrame = type('DiscardFrame', (Exception,), {})
     EVNT_FRAME_RECV = 'frame_received'
     EVNT_FRAME_SENT = 'frame_sent'
@@ -37,7 +47,7 @@ class Connection(object):
             'login': settings.username,
             'passcode': settings.password
         }
-        if settings.send_hb or settings.send_hb:
+        if settings.send_hb or settings.recv_hb:
             headers.update({
                 'heart-beat': "{send_hb},{recv_hb}".format(
                     send_hb=settings.send_hb,
@@ -46,32 +56,159 @@ class Connection(object):
             })
         return ConnectFrame(list(headers.items()))
 
+    @staticmethod
+    def configure_socket(settings, sock):
+        """Apply the socket options specified by `settings` to `sock`.
+        The TCP options are ignored for Unix domain sockets.
+        """
+        if settings.rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                settings.rcvbuf)
+        if settings.sndbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF,
+                settings.sndbuf)
+        if sock.family not in (socket.AF_INET, socket.AF_INET6):
+            return
+        if settings.tcp_nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if settings.keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if isinstance(settings.keepalive, tuple):
+                options = (getattr(socket, 'TCP_KEEPIDLE', None),
+                    getattr(socket, 'TCP_KEEPINTVL', None),
+                    getattr(socket, 'TCP_KEEPCNT', None))
+                for option, value in zip(options, settings.keepalive):
+                    if option is not None and value is not None:
+                        sock.setsockopt(socket.IPPROTO_TCP, option, value)
+
     @property
     def message_factory(self):
         return self.settings.message_factory
 
     def __init__(self, settings, lock=None):
         self.settings = settings
+        self.endpoints = EndpointSet.fromsettings(settings)
+        self.endpoint = None
+        self.socket = None
         self.lock = lock or threading.RLock()
         self.exclusive = threading.RLock()
         self.codec = Codec()
+        self.parser = self.codec.parser()
 
-        # Setup asynchronous frame receiving.
+        # Setup asynchronous frame receiving. The number of bytes read
+        # per call adapts to the sizes of the recent reads.
+        self.read_size = self.buf_size
+        self._short_reads = 0
+        self.read_lock = threading.RLock()
         self.frames = queue.Queue()
         self.thread = threading.Thread(target=self.__main__)
         self.thread.daemon = True
 
-
-        # Keep track of ingress and egress data for heartbeating.
-        self.data_in = collections.deque([], 10)
-        self.data_out = collections.deque([], 10)
+        # Outbound data is queued by the callers and written to the socket
+        # by a dedicated writer thread, so that publishers and the reader
+        # thread do not wait on each other.
+        self.outbound = collections.deque()
+        self.writer = threading.Thread(target=self.__writer__)
+        self.writer.daemon = True
+        self._writable = threading.Event()
+
+        # The writer thread only writes while the connection is online. If
+        # the connection is lost and reconnecting is enabled, outbound data
+        # is buffered until the connection is reestablished.
+        self._online = threading.Event()
+        self._online.set()
+        self._buffered = 0
+        self._lost = None
+        self.session = None
+        self.reconnects = 0
+        self.logger = logging.getLogger('stomp.connection')
+
+        # Statistics.
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        # Keep track of ingress and egress data for heartbeating. The
+        # intervals are negotiated when the connection is established.
+        self.heartbeat = Heartbeat()
 
         self._must_stop = False
+        self._wakeup = None
         self._observers = []
+        self._handlers = {}
         self._error = None
-        self._max_retries = 10
+        # A frame that was not confirmed in time may still have been
+        # processed by the server, so it is only sent again if retries
+        # are enabled explicitly.
+        self._max_retries = 0
         self._receipt_timeout = 1000
-        self._receipts = ReceiptManager(self)
+        self._receipts = ReceiptManager(self, settings.receipt_window)
+
+        # Reading from the socket is paused while any of the consumers
+        # registered in _paused holds too many unprocessed messages.
+        self._paused = set()
+        self._paused_since = None
+        self._paused_time = 0.0
+        self._pause_lock = threading.Lock()
+
+    @property
+    def paused(self):
+        """Indicates if reading from the socket is paused."""
+        return bool(self._paused)
+
+    @property
+    def paused_time(self):
+        """The total number of seconds reading from the socket was paused."""
+        with self._pause_lock:
+            since = self._paused_since
+            return self._paused_time + (time.monotonic() - since if since else 0)
+
+    @property
+    def stats(self):
+        """Return a dictionary holding statistics about the frames and
+        bytes sent and received on this connection.
+        """
+        return {
+            'frames_sent': self.frames_sent,
+            'frames_received': self.frames_received,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'receipts_pending': self._receipts.in_flight,
+            'paused': self.paused,
+            'paused_time': self.paused_time,
+            'reconnects': self.reconnects
+        }
+
+    def pause_reading(self, consumer):
+        """Stop reading from the socket until :meth:`resume_reading` is
+        invoked for `consumer`, so that the server is throttled by
+        TCP flow control.
+        """
+        with self._pause_lock:
+            if not self._paused:
+                self._paused_since = time.monotonic()
+            self._paused.add(consumer)
+
+    def resume_reading(self, consumer):
+        """Resume reading from the socket if no other consumer paused
+        it.
+        """
+        with self._pause_lock:
+            if consumer not in self._paused:
+                return
+            self._paused.discard(consumer)
+            if self._paused:
+                return
+            self._paused_time += time.monotonic() - self._paused_since
+            self._paused_since = None
+
+        # Data may have been pending while reading was paused, so allow
+        # the server a full grace period again; the same applies to the
+        # receipts, which could not be read in the meantime.
+        self.heartbeat.received()
+        self._receipts.renew(self._receipt_timeout)
+        self.wakeup()
 
     def claim(self):
         """Return a context-manager that exclusively claims all I/O
@@ -90,7 +227,17 @@ class Connection(object):
     def split_destinations(self, destinations):
         return destinations.split(self.settings.dest_separator)
 
+    def register_handler(self, command, handler):
+        """Route all received frames with the given `command` to the
+        callable `handler`, instead of adding them to the frame buffer.
+        """
+        self._handlers[command] = handler
+
     def register_observer(self, observer):
+        """Notify `observer` of every frame that is sent or received. An
+        observer may raise :attr:`DiscardFrame` to prevent a received
+        frame from being handled.
+        """
         if observer not in self._observers:
             self._observers.append(observer)
 
@@ -102,67 +249,165 @@ class Connection(object):
         """Return a boolean indicating if the client must send a heartbeat
         to the ``STOMP`` server.
         """
-        hb = False
-        if self.data_out:
-            delta_t = int(time.time() * 1000) - self.data_out[-1]
-            hb |= delta_t > self.settings.send_hb
+        return self.heartbeat.must_send()
 
-        return hb
+    def heartbeat_timeout(self):
+        """Return the number of seconds until the client must send a
+        heartbeat to the ``STOMP`` server, or ``None`` if no heartbeats
+        are sent.
+        """
+        return self.heartbeat.send_timeout()
+
+    def next_timeout(self):
+        """Return the number of seconds until the I/O loop must perform
+        a scheduled action, or ``None`` if nothing is scheduled.
+        """
+        # While reading is paused, the data sent by the server is not
+        # seen, so neither its heartbeats nor its receipts can be checked.
+        if self.paused:
+            timeouts = [self.heartbeat.send_timeout()]
+        else:
+            timeouts = [self.heartbeat.timeout(), self._receipts.timeout()]
+        timeouts = [t for t in timeouts if t is not None]
+        return min(timeouts) if timeouts else None
+
+    def wakeup(self):
+        """Interrupt the I/O loop, so that it reevaluates its state."""
+        try:
+            self._wakeup[1].send(b'\x00')
+        except (TypeError, EnvironmentError):
+            # The loop is not running or already has a pending wakeup.
+            pass
 
     def connect(self):
         """Connect the :class:`Connection` instance to the remote
         ``STOMP`` server.
         """
-        self._connect_socket()
-        self.send_frame(self.get_connect_frame(self.settings))
+        response, frames = self._establish()
+        self.socket.setblocking(0)
+        self._wakeup = socket.socketpair()
+        for sock in self._wakeup:
+            sock.setblocking(0)
+        session = Session.fromframe(self, response)
+        self.heartbeat = Heartbeat.negotiate(self.settings, session.send_hb,
+            session.recv_hb)
+        self.session = session
+        self.dispatch(frames)
+        self.writer.start()
         self.thread.start()
-        response = self.recv_frame(True, 2500)
-        return Session.fromframe(self, response)
+        return session
 
     def update(self):
         """Read all data from the socket and add the frames to the frame
         buffer.
         """
-        with self.lock:
-            octet_count = 0
-            buf = io.BytesIO()
-            while True:
-                # Note: this approach assumes that the server always
-                # sends us complete frames.
+        with self.read_lock:
+            # Stop reading as soon as a consumer paused reading, so
+            # that at most one read is buffered beyond its limit.
+            while not self.paused:
+                # Frames may be split across multiple reads; the parser
+                # keeps partial frames until the remaining octets arrive.
                 try:
-                    buf.write(self.recv(self.buf_size))
+                    n = self.parser.recv_into(self.recv_into, self.read_size)
                 except EnvironmentError as e:
                     if e.errno != errno.EAGAIN: raise
                     break
-
-            buf.seek(0)
-
-        # Continue to the next iteration if there are no
-        # octets to read.
-        for frame in self.codec.consume_buffer(buf):
+                self._adapt_read_size(n)
+                self.dispatch(list(self.parser))
+                if not n:
+                    raise ConnectionLost("Connection closed by the server.")
+
+    def _adapt_read_size(self, n):
+        # Double the read size while reads fill it, so that large messages
+        # are received with few system calls, and halve it again after a
+        # run of reads that used less than a quarter of it.
+        size = self.read_size
+        if n >= size:
+            self.read_size = min(size * 2, self.max_buf_size)
+            self._short_reads = 0
+        elif n < size // 4 and size > self.buf_size:
+            self._short_reads += 1
+            if self._short_reads >= 16:
+                self.read_size = size // 2
+                self._short_reads = 0
+        else:
+            self._short_reads = 0
+
+    def dispatch(self, frames):
+        """Pass the received `frames` to the handler registered for their
+        command, or add them to the frame buffer if there is none.
+        """
+        self.frames_received += len(frames)
+        handlers = self._handlers
+        for frame in frames:
             if frame.is_error():
                 raise StompException.fromframe(frame)
-            try:
-                self.notify_observers(self.EVNT_FRAME_RECV, frame=frame)
-            except self.DiscardFrame:
-                pass
+            if self._observers:
+                try:
+                    self.notify_observers(self.EVNT_FRAME_RECV, frame=frame)
+                except self.DiscardFrame:
+                    continue
+            handler = handlers.get(frame.command)
+            if handler is not None:
+                handler(frame)
+                continue
             self.frames.put(frame)
 
-    def send_frame(self, frame):
+    def send_frame(self, frame, wait=True):
         """Sends a ``STOMP`` frame, represented as a :class:`
-        ~stomp.frames.Frame` instance, to the remote server.
+        ~stomp.frames.Frame` instance, to the remote server. See
+        :meth:`send_encoded` for `wait`.
         """
         self.notify_observers(self.EVNT_FRAME_SENT, frame=frame)
-        raw = self.codec.encode(*frame, encode=True)
+        raw = self.codec.encode_segments(*frame)
+        receipt_id = frame.receipt_id if frame.expects_receipt() else None
+        return self.send_encoded(raw, receipt_id, wait=wait)
+
+    def send_encoded(self, raw, receipt_id=None, frames=1, wait=True):
+        """Send an encoded ``STOMP`` frame, or `frames` consecutive encoded
+        frames, to the remote server. If `receipt_id` is not ``None``,
+        block until the frame is confirmed by the server.
+
+        If a receipt window is configured, or if `wait` is ``False``,
+        frames that expect a receipt are pipelined: a :class:`
+        ~concurrent.futures.Future` is returned that is resolved when the
+        server confirms the frame. This method then only blocks if the
+        window of unconfirmed frames is full; frames sent with `wait`
+        set to ``False`` never block and do not take a slot in the window.
+
+        Receipts are not read while reading is paused, see
+        :meth:`pause_reading`; a consumer that paused reading must
+        therefore not wait for receipts, e.g. for the ``ACK`` frames of
+        its messages.
+
+        If the receipt does not arrive in time, :exc:`~stomp.exc.
+        FrameNotConfirmed` is raised. If reconnecting is enabled, frames
+        that were not confirmed when the connection was lost are sent
+        again after reconnecting.
+        """
+        if receipt_id is not None and not wait:
+            return self._send_pipelined(raw, receipt_id, frames,
+                windowed=False)
+        if receipt_id is not None and self._receipts.window is not None:
+            return self._send_pipelined(raw, receipt_id, frames)
+
+        data = raw if self.settings.reconnect else None
         attempts = 0
-        #print(raw)
         while True:
-            result = self.send(raw)
-            if not frame.expects_receipt():
+            if receipt_id is not None:
+                future = self._receipts.expect(receipt_id,
+                    self._receipt_timeout, data=data)
+            try:
+                result = self.send(raw, frames, receipt_id)
+            except Exception as e:
+                if receipt_id is not None:
+                    self._receipts.cancel(receipt_id, e)
+                raise
+            if receipt_id is None:
                 break
 
             try:
-                self._receipts.wait(frame.receipt_id, self._receipt_timeout)
+                self.wait_receipt(future)
                 break
             except FrameNotConfirmed:
                 attempts += 1
@@ -171,23 +416,164 @@ class Connection(object):
 
         return result
 
-    def send(self, seq):
-        """Send a byte-sequence to the remote server."""
+    def wait_receipt(self, future):
+        """Block until the frame represented by `future`, as returned by
+        :meth:`send_encoded`, is confirmed by the server. Raise :exc:`
+        ~stomp.exc.FrameNotConfirmed` if the receipt did not arrive in
+        time; the frame is not sent again.
+        """
+        # The future is failed by the I/O loop when the deadline passes;
+        # the timeout only guards against a loop that is not running,
+        # unless it is reconnecting.
+        while True:
+            try:
+                return future.result(self._receipt_timeout / 1000.0 + 1)
+            except futures.TimeoutError:
+                if self._online.is_set() or self._is_stopped():
+                    raise FrameNotConfirmed
+
+    def _send_pipelined(self, raw, receipt_id, frames, windowed=True):
+        # Do not take a slot in the window if the frame can not be sent;
+        # once the I/O loop exited, nothing would release it.
+        if self._error is not None:
+            raise self._error
+        data = raw if self.settings.reconnect else None
+        register = self._receipts.submit if windowed else self._receipts.expect
+        future = register(receipt_id, self._receipt_timeout, data=data)
+        try:
+            self.send(raw, frames, receipt_id)
+        except Exception as e:
+            self._receipts.cancel(receipt_id, e)
+            raise
+        return future
+
+    def send(self, seq, frames=1, receipt_id=None):
+        """Queue a byte-sequence, or a list of byte-sequences, holding
+        `frames` encoded frames to be sent to the remote server by the
+        writer thread. Return the number of bytes queued.
+
+        While reconnecting, at most ``reconnect_buffer`` bytes are queued;
+        :exc:`~stomp.exc.ConnectionLost` is raised if the buffer is full.
+        """
+        if self._error is not None:
+            raise self._error
+        n = sum(map(len, seq)) if isinstance(seq, list) else len(seq)
         with self.lock:
-            #if len(seq) > 1:
-            #    print(seq)
-            self.data_out.append(int(time.time() * 1000))
-            return self.socket.send(seq)
+            if not self._online.is_set():
+                if self._buffered + n > self.settings.reconnect_buffer:
+                    raise ConnectionLost(
+                        "The outbound buffer is full while reconnecting.")
+                self._buffered += n
+            self.frames_sent += frames
+            if receipt_id is not None and self.settings.reconnect:
+                # Let the writer thread report when the frame is written,
+                # so that it is sent again if the connection is lost
+                # before it is confirmed.
+                seq = (receipt_id, seq)
+            self._enqueue(seq)
+        return n
+
+    def flush(self, timeout=None):
+        """Block until all data queued before this call is written to
+        the socket. Return a boolean indicating if all data was written
+        within `timeout` milliseconds.
+        """
+        marker = threading.Event()
+        self._enqueue(marker)
+        deadline = (time.monotonic() + timeout / 1000.0) if timeout else None
+        while not marker.wait(0.05):
+            if not self.writer.is_alive():
+                return marker.is_set()
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+        return True
+
+    def _enqueue(self, item):
+        # Appending to a deque is thread-safe; the writer thread is
+        # signaled that there is data to send.
+        self.heartbeat.sent()
+        self.outbound.append(item)
+        self._writable.set()
+
+    def _sendall(self, buffers, sock=None):
+        # Scatter/gather I/O prevents copying the frame bodies into a new
+        # buffer. The socket is non-blocking, so writes may be partial.
+        sock = sock or self.socket
+        views = collections.deque(memoryview(b) for b in buffers if len(b))
+        sendmsg = getattr(sock, 'sendmsg', None)
+        total = 0
+        while views:
+            try:
+                if sendmsg is not None:
+                    n = sendmsg(list(itertools.islice(views, self.iov_max)))
+                else:
+                    n = sock.send(views[0])
+            except EnvironmentError as e:
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK): raise
+                self._wait_writable(sock)
+                continue
+
+            total += n
+            self.bytes_sent += n
+            while n:
+                if n < len(views[0]):
+                    views[0] = views[0][n:]
+                    break
+                n -= len(views.popleft())
+
+        return total
+
+    def _wait_writable(self, sock):
+        # Stop waiting if the socket was replaced after reconnecting; the
+        # next write then fails on the closed socket.
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(sock, selectors.EVENT_WRITE)
+            while not self._is_stopped() and sock is self.socket:
+                if selector.select(1):
+                    break
+        finally:
+            selector.close()
+
+    def send_frames(self, frames, wait=True):
+        """Send multiple ``STOMP`` frames with as few system calls as
+        possible. Only a receipt requested by the last frame is tracked;
+        since the server processes frames in order, it confirms the
+        complete batch. See :meth:`send_encoded` for `wait`.
+        """
+        raw = []
+        count = 0
+        frame = None
+        for frame in frames:
+            self.notify_observers(self.EVNT_FRAME_SENT, frame=frame)
+            raw.extend(self.codec.encode_segments(*frame))
+            count += 1
+        if frame is None:
+            return 0
+        receipt_id = frame.receipt_id if frame.expects_receipt() else None
+        return self.send_encoded(raw, receipt_id, count, wait=wait)
 
     def recv(self, n):
         """Receive at maximum ``n`` amount of bytes from the server."""
-        with self.lock:
+        with self.read_lock:
             seq = self.socket.recv(n)
+            self.bytes_received += len(seq)
             if seq:
-                self.data_in.append(int(time.time() * 1000))
+                self.heartbeat.received()
             #print(seq)
         return seq
 
+    def recv_into(self, buf, n=0):
+        """Receive at maximum ``n`` amount of bytes from the server into
+        the writable buffer `buf`. Return the number of bytes received.
+        """
+        with self.read_lock:
+            count = self.socket.recv_into(buf, n)
+            self.bytes_received += count
+            if count:
+                self.heartbeat.received()
+        return count
+
     def recv_frame(self, block=True, timeout=None):
         """Receive one frame from the ``STOMP`` server."""
         if timeout:
@@ -206,43 +592,331 @@ class Connection(object):
         server and closes the socket.
         """
         with self.lock:
-            self.send_frame(DisconnectFrame())
+            if self._is_stopped():
+                return
+            if self._online.is_set():
+                self.send_frame(DisconnectFrame())
+                self.flush(self._receipt_timeout)
             self._close_connection()
 
-    def _connect_socket(self):
-        # TODO: IPv6 support!!!!!!!!!
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.connect((self.settings.host, self.settings.port))
-        self.socket.setblocking(0)
+    def _connect_socket(self, endpoint):
+        # The address of a Unix domain socket is its path.
+        timeout = self.settings.connect_timeout / 1000.0
+        if isinstance(endpoint, str):
+            return self._connect_address((socket.AF_UNIX, socket.SOCK_STREAM,
+                0, '', endpoint), timeout)
+
+        # Resolve all addresses of the endpoint and connect to them
+        # concurrently, alternating between the address families, so that
+        # a broken IPv6 route does not delay connecting over IPv4.
+        host, port = endpoint
+        addresses = interleave(socket.getaddrinfo(host, port,
+            socket.AF_UNSPEC, socket.SOCK_STREAM))
+        attempts = [functools.partial(self._connect_address, address, timeout)
+            for address in addresses]
+        return race(attempts, self.settings.address_delay / 1000.0,
+            timeout=timeout, discard=lambda sock: sock.close())
+
+    def _connect_address(self, address, timeout):
+        family, socktype, proto, _, sockaddr = address
+        sock = socket.socket(family, socktype, proto)
+        try:
+            # The buffer sizes must be set before connecting, since they
+            # determine the TCP window scale.
+            self.configure_socket(self.settings, sock)
+            sock.settimeout(timeout)
+            sock.connect(sockaddr)
+        except EnvironmentError:
+            sock.close()
+            raise
+        return sock
+
+    def _establish(self):
+        # Connect to the endpoints in parallel, in the order of their
+        # health and latency, and continue with the first one that
+        # completes the handshake. Return the CONNECTED frame and any
+        # frames received after it.
+        attempts = [functools.partial(self._open, endpoint)
+            for endpoint in self.endpoints.ranked()]
+        sock, endpoint, parser, frames, sent, received = race(attempts,
+            self.settings.endpoint_delay / 1000.0,
+            discard=lambda result: result[0].close())
+        self.socket = sock
+        self.endpoint = endpoint
+        self.parser = parser
+        self.frames_sent += 1
+        self.frames_received += 1
+        self.bytes_sent += sent
+        self.bytes_received += received
+        return frames[0], frames[1:]
+
+    def _open(self, endpoint):
+        # Connect to a single endpoint and perform the CONNECT handshake;
+        # invoked concurrently for all endpoints by _establish().
+        started = time.monotonic()
+        sock = None
+        try:
+            sock = self._connect_socket(endpoint)
+            sock.settimeout(2.5)
+            parser = self.codec.parser()
+            frame = self.get_connect_frame(self.settings)
+            data = b''.join(self.codec.encode_segments(*frame))
+            sock.sendall(data)
+            frames = []
+            received = 0
+            while not frames:
+                n = parser.recv_into(sock.recv_into, self.buf_size)
+                if not n:
+                    raise ConnectionLost("Connection closed by the server.")
+                received += n
+                frames = list(parser)
+            if frames[0].is_error():
+                raise StompException.fromframe(frames[0])
+        except (FatalException, EnvironmentError):
+            if sock is not None:
+                sock.close()
+            self.endpoints.failed(endpoint)
+            raise
+        self.endpoints.succeeded(endpoint, time.monotonic() - started)
+        return sock, endpoint, parser, frames, len(data), received
 
     def _close_connection(self):
         self._stop()
-        self.socket.close()
+        if self.socket is not None:
+            self.socket.close()
 
     def _stop(self):
         self._must_stop = True
+        self._writable.set()
+        self._online.set()
+        self.wakeup()
 
     def _is_stopped(self):
         return self._must_stop
 
     def __main__(self):
-        # A main event loop draining data from the socket and putting it
-        # in a buffer.
-        self._must_stop = False
-        while True:
-            if self._is_stopped():
-                break
+        # A main event loop blocking until data can be read from the socket,
+        # a heartbeat must be sent or the loop is woken up, e.g. to stop.
+        # The socket is registered by the first iteration, unless the
+        # connection was closed before the loop started.
+        waker = self._wakeup[0]
+        selector = selectors.DefaultSelector()
+        selector.register(waker, selectors.EVENT_READ)
+        reading = False
+        try:
+            while not self._is_stopped():
+                # Reconnect if the connection was lost by either thread.
+                if not self._online.is_set():
+                    if reading:
+                        selector.unregister(self.socket)
+                        reading = False
+                    self._recover()
+                    continue
+
+                # Stop watching the socket while reading is paused, and
+                # resume when woken up after the consumers caught up.
+                if reading == self.paused:
+                    reading = not reading
+                    if reading:
+                        self.heartbeat.received()
+                        selector.register(self.socket, selectors.EVENT_READ)
+                    else:
+                        selector.unregister(self.socket)
+
+                readable = False
+                for key, _ in selector.select(self.next_timeout()):
+                    if key.fileobj is waker:
+                        self._drain_wakeup()
+                    else:
+                        readable = True
+
+                if self._is_stopped():
+                    break
+
+                if reading:
+                    self._receipts.expire()
 
-            with self.lock:
                 # Send a newline to satisfy the servers' heartbeat
                 # expectations, if necessary.
                 if self.must_heartbeat():
-                    self.send('\n'.encode())
-
+                    self._enqueue(b'\n')
+
+                if not readable:
+                    # Declare the server dead if it did not send data
+                    # within the grace period.
+                    if reading and self.heartbeat.is_dead():
+                        self._connection_lost(ConnectionLost(
+                            "The server did not send a heartbeat."))
+                    continue
                 try:
                     self.update()
-                except StompException as e:
-                    self._close_connection()
-                    self._error = e
+                except (FatalException, EnvironmentError) as e:
+                    self._connection_lost(e)
+        finally:
+            self._receipts.fail(self._error or ConnectionLost("Connection closed."))
+            selector.close()
+            for sock in self._wakeup:
+                sock.close()
+
+    def _connection_lost(self, error, sock=None):
+        # Reconnect if enabled and the connection was lost for a reason
+        # other than a protocol error; otherwise close the connection.
+        # Errors on a socket that was already replaced are ignored.
+        if sock is not None and sock is not self.socket:
+            return
+        if not self._can_reconnect(error):
+            self._close_connection()
+            self._error = error
+            return
+        self._lost = error
+        if self.endpoint is not None:
+            self.endpoints.failed(self.endpoint)
+        self._online.clear()
+        self.wakeup()
+
+    def _can_reconnect(self, error):
+        return self.settings.reconnect and self.session is not None\
+            and not self._is_stopped()\
+            and isinstance(error, (ConnectionLost, EnvironmentError, ValueError))
+
+    def _recover(self):
+        try:
+            self._reconnect()
+        except (FatalException, EnvironmentError) as e:
+            self._close_connection()
+            self._error = e
+
+    def _reconnect(self):
+        # Reconnect with exponential backoff. Each delay is randomized
+        # between half and the full value, so that clients that lost their
+        # connections at the same time do not reconnect all at once.
+        error = self._lost
+        self.logger.warning("Connection lost ({0}); reconnecting".format(error))
+        try:
+            self.socket.close()
+        except EnvironmentError:
+            pass
+
+        delay = self.settings.reconnect_delay
+        attempts = 0
+        while not self._is_stopped():
+            limit = self.settings.reconnect_attempts
+            if limit and attempts >= limit:
+                raise error
+            attempts += 1
+            self._sleep(random.uniform(delay / 2.0, delay) / 1000.0)
+            if self._is_stopped():
+                return
+            try:
+                self._restore(*self._establish())
+            except (FatalException, EnvironmentError) as e:
+                self.logger.warning(
+                    "Reconnect attempt {0} failed ({1})".format(attempts, e))
+                error = e
+                self.socket.close()
+                delay = min(delay * 2, self.settings.reconnect_max_delay)
+                continue
+
+            self.reconnects += 1
+            self.logger.info("Reconnected after {0} attempt(s)".format(attempts))
+            with self.lock:
+                self._buffered = 0
+                self._online.set()
+            self._writable.set()
+            self.notify_observers(self.EVNT_RECONNECT, frame=None)
+            return
+
+    def _restore(self, response, frames):
+        # Restore the session on the reestablished connection, before the
+        # writer thread resumes writing the buffered data.
+        send_hb = recv_hb = 0
+        if response.has_header(HDR_HEARBEAT):
+            send_hb, recv_hb = map(int, response.headers[HDR_HEARBEAT].split(','))
+        self.heartbeat = Heartbeat.negotiate(self.settings, send_hb, recv_hb)
+
+        # Restore the subscriptions under their original ids and send the
+        # frames that were written but not confirmed again.
+        raw = []
+        for sub in self.session.subscriptions:
+            raw.extend(self.codec.encode_segments(*sub.subscribe_frame))
+        for data in self._receipts.unconfirmed():
+            raw.extend(data if isinstance(data, list) else [data])
+        if raw:
+            data = b''.join(raw)
+            self.socket.sendall(data)
+            self.bytes_sent += len(data)
+        self.socket.setblocking(0)
+        self._receipts.renew(self._receipt_timeout)
+        self.dispatch(frames)
+
+    def _sleep(self, seconds):
+        # Sleep for the given number of seconds, unless the connection is
+        # closed in the meantime.
+        deadline = time.monotonic() + seconds
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(self._wakeup[0], selectors.EVENT_READ)
+            while not self._is_stopped():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if selector.select(remaining):
+                    self._drain_wakeup()
+        finally:
+            selector.close()
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup[0].recv(1024):
+                pass
+        except EnvironmentError:
+            pass
 
-            time.sleep(0.02)
+    def __writer__(self):
+        # Drain the outbound queue in batches, so that many small frames
+        # are written with a single system call.
+        outbound = self.outbound
+        try:
+            while True:
+                self._writable.wait()
+                self._writable.clear()
+                self._online.wait()
+                if self._is_stopped():
+                    break
+
+                sock = self.socket
+                items = []
+                batch = []
+                written = []
+                while outbound:
+                    item = outbound.popleft()
+                    items.append(item)
+                    if isinstance(item, tuple):
+                        written.append(item[0])
+                        item = item[1]
+                    if isinstance(item, list):
+                        batch.extend(item)
+                    elif not isinstance(item, threading.Event):
+                        batch.append(item)
+                try:
+                    if batch:
+                        self._sendall(batch, sock)
+                except (EnvironmentError, ValueError) as e:
+                    if not self._can_reconnect(e):
+                        raise
+                    # Write the batch again after reconnecting. Frames
+                    # that were written before the error may be received
+                    # twice.
+                    outbound.extendleft(reversed(items))
+                    self._connection_lost(e, sock)
+                    self._writable.set()
+                    continue
+                if written:
+                    self._receipts.written(written)
+                for item in items:
+                    if isinstance(item, threading.Event):
+                        item.set()
+        except (EnvironmentError, ValueError) as e:
+            if not self._is_stopped():
+                self._close_connection()
+                self._error = e
@@ -0,0 +1,80 @@
+import array
+import hashlib
+import time
+
+
+def digest(mid):
+    """Return a 64-bit integer digest of the message identifier `mid`."""
+    data = str(mid).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+        'little', signed=True)
+
+
+class DuplicateIndex(object):
+    """Remembers the identifiers of the last `size` messages received by
+    a subscription, to detect redeliveries in constant time.
+
+    Rather than the identifiers themselves, which are typically long
+    strings, a fixed-width 64-bit digest of each identifier is kept in a
+    hash set for lookups and in a preallocated ring buffer for eviction
+    in insertion order. If `max_age` is specified, identifiers are also
+    evicted when they were added more than `max_age` milliseconds ago,
+    as measured by `clock`. A `size` of zero disables duplicate
+    detection.
+    """
+
+    @property
+    def duplicates(self):
+        """The number of duplicate identifiers that were rejected."""
+        return self._duplicates
+
+    def __init__(self, size=1000, max_age=None, clock=time.monotonic):
+        self.size = size
+        self.max_age = max_age
+        self.clock = clock
+        self.ids = set()
+        self._order = array.array('q', [0]) * size
+        self._times = array.array('d', [0.0]) * size if max_age else None
+        self._head = 0
+        self._count = 0
+        self._duplicates = 0
+
+    def add(self, mid):
+        """Add the message identifier `mid` to the index. Return a boolean
+        indicating if `mid` was not seen before.
+        """
+        if not self.size:
+            return True
+        key = digest(mid)
+        now = None
+        if self._times is not None:
+            now = self.clock()
+            self._expire(now - self.max_age / 1000.0)
+        if key in self.ids:
+            self._duplicates += 1
+            return False
+        if self._count == self.size:
+            self._evict()
+
+        tail = (self._head + self._count) % self.size
+        self._order[tail] = key
+        if now is not None:
+            self._times[tail] = now
+        self.ids.add(key)
+        self._count += 1
+        return True
+
+    def _evict(self):
+        self.ids.discard(self._order[self._head])
+        self._head = (self._head + 1) % self.size
+        self._count -= 1
+
+    def _expire(self, deadline):
+        while self._count and self._times[self._head] < deadline:
+            self._evict()
+
+    def __contains__(self, mid):
+        return digest(mid) in self.ids
+
+    def __len__(self):
+        return self._count
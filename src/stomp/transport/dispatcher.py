@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+
+from stomp.const import HDR_DESTINATION
+
+
+class Dispatcher(object):
+    """Invokes a handler for each message received by a subscription,
+    using a fixed number of worker threads.
+
+    Messages are assigned to a worker by their ordering key, so messages
+    with the same key are handled in the order they were received, while
+    messages with different keys are handled in parallel. When a worker
+    holds `maxsize` pending messages, the `pause` callable bound with
+    :meth:`bind` is invoked, e.g. to stop reading from the socket; the
+    `resume` callable is invoked once all workers are down to half of
+    `maxsize` pending messages. :meth:`put` never blocks the thread
+    receiving the messages; since reading stops as soon as it is paused,
+    a worker holds at most `maxsize` messages plus those decoded from
+    the last read.
+
+    Args:
+        handler: a callable accepting a :class:`~stomp.transport.message.
+            Message` instance.
+        workers: the number of worker threads.
+        order_key: the name of a header, or a callable accepting a
+            message and returning a hashable key. Defaults to the
+            destination of the message.
+        maxsize: the number of pending messages per worker at which
+            the receiving of messages is paused.
+    """
+    _stop = object()
+
+    def __init__(self, handler, workers=4, order_key=None, maxsize=1000):
+        if workers < 1:
+            raise ValueError("A Dispatcher needs at least one worker.")
+        self.handler = handler
+        self.order_key = order_key or HDR_DESTINATION
+        self.maxsize = maxsize
+        self.low_water = maxsize // 2
+        self.queues = [queue.Queue() for _ in range(workers)]
+        self.threads = []
+        self.logger = logging.getLogger('stomp.dispatcher')
+        self._pause = self._resume = None
+        self._full = set()
+        self._lock = threading.Lock()
+        for n, q in enumerate(self.queues):
+            t = threading.Thread(target=self.__main__, args=[n, q])
+            t.daemon = True
+            t.start()
+            self.threads.append(t)
+
+    def get_key(self, msg):
+        """Return the ordering key of `msg`."""
+        if callable(self.order_key):
+            return self.order_key(msg)
+        return msg.headers.get(self.order_key, '')
+
+    def bind(self, pause, resume):
+        """Invoke the callable `pause` when a worker holds too many pending
+        messages, and `resume` when the workers caught up.
+        """
+        self._pause = pause
+        self._resume = resume
+
+    def put(self, msg):
+        """Schedule `msg` for handling by the worker selected by its
+        ordering key.
+        """
+        n = hash(self.get_key(msg)) % len(self.queues)
+        q = self.queues[n]
+        q.put(msg)
+        if not self.maxsize or q.qsize() < self.maxsize:
+            return
+        with self._lock:
+            if n in self._full or q.qsize() < self.maxsize:
+                return
+            pause = not self._full
+            self._full.add(n)
+        if pause and self._pause is not None:
+            self._pause()
+
+    def join(self):
+        """Block until all pending messages are handled."""
+        for q in self.queues:
+            q.join()
+
+    def close(self, wait=True):
+        """Stop the workers after the pending messages are handled. If
+        `wait` is ``True``, block until the workers have exited.
+        """
+        for q in self.queues:
+            q.put(self._stop)
+        if wait:
+            current = threading.current_thread()
+            for t in self.threads:
+                if t is not current:
+                    t.join()
+
+    def __main__(self, n, q):
+        while True:
+            msg = q.get()
+            try:
+                if msg is self._stop:
+                    break
+                self.handler(msg)
+            except Exception:
+                self.logger.exception("Unhandled exception in message handler")
+            finally:
+                q.task_done()
+                if self._full:
+                    self._drained(n, q)
+
+    def _drained(self, n, q):
+        # Resume once no worker holds more than low_water messages. The
+        # check is made under the lock, so that a worker can not drain its
+        # queue between put() finding it full and registering it.
+        with self._lock:
+            if n not in self._full or q.qsize() > self.low_water:
+                return
+            self._full.discard(n)
+            resume = not self._full
+        if resume and self._resume is not None:
+            self._resume()
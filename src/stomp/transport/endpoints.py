@@ -0,0 +1,209 @@
+import queue
+import socket
+import threading
+import time
+
+
+UNIX_SCHEME = 'unix://'
+
+
+def parse_endpoint(endpoint):
+    """Return the address of a broker `endpoint`, specified either as a
+    ``(host, port)`` tuple or as a ``host:port`` string. IPv6 addresses
+    must be enclosed in brackets, e.g. ``[::1]:61613``.
+
+    A Unix domain socket is specified as ``unix:///path/to/socket``, also
+    as the host of a tuple without port; its address is the path.
+    """
+    if isinstance(endpoint, (tuple, list)):
+        host, port = endpoint
+        if port is None and is_unix(host):
+            return parse_endpoint(host)
+        return (host, port)
+    if is_unix(endpoint):
+        path = endpoint[len(UNIX_SCHEME):]
+        if not path:
+            raise ValueError("Invalid endpoint: {0!r}".format(endpoint))
+        return path
+    host, sep, port = endpoint.rpartition(':')
+    if not sep or not host:
+        raise ValueError("Invalid endpoint: {0!r}".format(endpoint))
+    if host.startswith('[') and host.endswith(']'):
+        host = host[1:-1]
+    return (host, int(port))
+
+
+def is_unix(endpoint):
+    """Return a boolean indicating if `endpoint` specifies a Unix domain
+    socket.
+    """
+    return isinstance(endpoint, str) and endpoint.startswith(UNIX_SCHEME)
+
+
+def interleave(addresses):
+    """Reorder the `addresses` returned by :func:`socket.getaddrinfo`,
+    so that the address families alternate, starting with the family of
+    the first address. Within a family, the order is preserved.
+    """
+    families = {}
+    for address in addresses:
+        families.setdefault(address[0], []).append(address)
+    result = []
+    groups = list(families.values())
+    while groups:
+        result.extend(group.pop(0) for group in groups)
+        groups = [group for group in groups if group]
+    return result
+
+
+class EndpointSet(object):
+    """Ranks the broker endpoints of a connection by their health and
+    their recent handshake latencies.
+
+    The latency of each endpoint is a moving average of the time it took
+    to complete the ``CONNECT`` handshake. An endpoint that failed is
+    considered unhealthy for `quarantine` milliseconds; it is only tried
+    after all healthy endpoints.
+    """
+    smoothing = 0.3
+
+    @classmethod
+    def fromsettings(cls, settings):
+        """Return the :class:`EndpointSet` configured by `settings`,
+        which defaults to the single endpoint specified by the ``host``
+        and ``port`` settings.
+        """
+        endpoints = settings.endpoints or [(settings.host, settings.port)]
+        return cls([parse_endpoint(e) for e in endpoints])
+
+    def __init__(self, endpoints, quarantine=5000, clock=time.monotonic):
+        if not endpoints:
+            raise ValueError("At least one endpoint is required.")
+        self.endpoints = list(endpoints)
+        self.quarantine = quarantine / 1000.0
+        self.clock = clock
+        self.latencies = {}
+        self._failed = {}
+        self._lock = threading.Lock()
+
+    def ranked(self):
+        """Return the endpoints in the order they should be tried: the
+        healthy endpoints by increasing latency, followed by the healthy
+        endpoints that were not measured yet and the unhealthy endpoints,
+        each in configuration order.
+        """
+        now = self.clock()
+        with self._lock:
+            def key(item):
+                index, endpoint = item
+                failed = self._failed.get(endpoint)
+                unhealthy = failed is not None\
+                    and now - failed < self.quarantine
+                latency = self.latencies.get(endpoint)
+                return (unhealthy, latency is None, latency or 0, index)
+            return [e for _, e in sorted(enumerate(self.endpoints), key=key)]
+
+    def succeeded(self, endpoint, latency):
+        """Record that the handshake with `endpoint` completed after
+        `latency` seconds.
+        """
+        with self._lock:
+            self._failed.pop(endpoint, None)
+            previous = self.latencies.get(endpoint)
+            if previous is not None:
+                latency = previous + self.smoothing * (latency - previous)
+            self.latencies[endpoint] = latency
+
+    def failed(self, endpoint):
+        """Record that connecting to `endpoint` failed, or that an
+        established connection to it was lost.
+        """
+        with self._lock:
+            self._failed[endpoint] = self.clock()
+
+    def __iter__(self):
+        return iter(self.endpoints)
+
+    def __len__(self):
+        return len(self.endpoints)
+
+
+def race(attempts, delay, timeout=None, discard=None):
+    """Invoke the callables in `attempts` concurrently and return the
+    result of the first one that succeeds.
+
+    Each attempt is started `delay` seconds after the previous one, or
+    immediately when all started attempts failed. Results of attempts
+    that succeed after the winner are passed to the `discard` callable.
+    If all attempts fail, the last exception is raised; if none
+    succeeded within `timeout` seconds, :exc:`socket.timeout` is raised.
+    """
+    attempts = list(attempts)
+    if len(attempts) == 1:
+        return attempts[0]()
+
+    results = queue.Queue()
+    lock = threading.Lock()
+    finished = [False]
+
+    def run(attempt):
+        try:
+            result = attempt()
+        except Exception as e:
+            results.put((False, e))
+            return
+        with lock:
+            late = finished[0]
+            if not late:
+                results.put((True, result))
+        if late and discard is not None:
+            discard(result)
+
+    def settle():
+        # Discard the results of attempts that succeeded at the same
+        # time as the winner.
+        with lock:
+            finished[0] = True
+        while True:
+            try:
+                ok, result = results.get_nowait()
+            except queue.Empty:
+                break
+            if ok and discard is not None:
+                discard(result)
+
+    now = time.monotonic()
+    deadline = (now + timeout) if timeout is not None else None
+    started = failed = 0
+    next_start = now
+    error = None
+    while True:
+        now = time.monotonic()
+        if started < len(attempts) and now >= next_start:
+            thread = threading.Thread(target=run, args=[attempts[started]])
+            thread.daemon = True
+            thread.start()
+            started += 1
+            next_start = now + delay
+
+        wait = [deadline - now] if deadline is not None else []
+        if started < len(attempts):
+            wait.append(next_start - now)
+        try:
+            ok, result = results.get(True, max(min(wait), 0) if wait else None)
+        except queue.Empty:
+            if deadline is not None and time.monotonic() >= deadline:
+                settle()
+                raise socket.timeout("Connecting timed out.")
+            continue
+
+        if ok:
+            settle()
+            return result
+        error = result
+        failed += 1
+        if failed == len(attempts):
+            raise error
+        if failed == started:
+            next_start = time.monotonic()
+
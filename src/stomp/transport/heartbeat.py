@@ -0,0 +1,77 @@
+import time
+
+
+class Heartbeat(object):
+    """Keeps track of the heartbeats exchanged with the ``STOMP`` server.
+
+    The client must send data at least every `send_interval` milliseconds
+    and expects data from the server at least every `recv_interval`
+    milliseconds. The server is considered dead if nothing was received
+    for `grace` times `recv_interval`. An interval of zero disables the
+    respective heartbeat. All deadlines use a monotonic clock.
+    """
+
+    @classmethod
+    def negotiate(cls, settings, server_send, server_recv):
+        """Return a :class:`Heartbeat` using the intervals negotiated from
+        the client `settings` and the ``heart-beat`` header sent by the
+        server.
+        """
+        send = max(settings.send_hb, server_recv)\
+            if (settings.send_hb and server_recv) else 0
+        recv = max(settings.recv_hb, server_send)\
+            if (settings.recv_hb and server_send) else 0
+        return cls(send, recv, grace=settings.heartbeat_grace)
+
+    def __init__(self, send_interval=0, recv_interval=0, grace=2.0,
+        clock=time.monotonic):
+        self.send_interval = send_interval / 1000.0
+        self.recv_interval = recv_interval / 1000.0
+        self.grace = grace
+        self.clock = clock
+        self.last_sent = self.last_received = clock()
+
+    def sent(self):
+        """Record that data was sent to the server."""
+        self.last_sent = self.clock()
+
+    def received(self):
+        """Record that data was received from the server."""
+        self.last_received = self.clock()
+
+    def send_timeout(self):
+        """Return the number of seconds until the client must send a
+        heartbeat, or ``None`` if no heartbeats are sent.
+        """
+        if not self.send_interval:
+            return None
+        deadline = self.last_sent + self.send_interval
+        return max(deadline - self.clock(), 0)
+
+    def recv_timeout(self):
+        """Return the number of seconds until the server is considered
+        dead, or ``None`` if the server does not send heartbeats.
+        """
+        if not self.recv_interval:
+            return None
+        deadline = self.last_received + self.recv_interval * self.grace
+        return max(deadline - self.clock(), 0)
+
+    def timeout(self):
+        """Return the number of seconds until a heartbeat must be sent or
+        the server must have sent data, or ``None`` if heartbeating is
+        disabled.
+        """
+        timeouts = [t for t in (self.send_timeout(), self.recv_timeout())
+            if t is not None]
+        return min(timeouts) if timeouts else None
+
+    def must_send(self):
+        """Return a boolean indicating if a heartbeat must be sent."""
+        return self.send_timeout() == 0
+
+    def is_dead(self):
+        """Return a boolean indicating if the server missed its
+        heartbeats.
+        """
+        return self.recv_timeout() == 0
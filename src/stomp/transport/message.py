@@ -1,3 +1,4 @@
+from stomp.const import HDR_ACK
 from stomp.const import HDR_CONTENT_LENGTH
 from stomp.const import HDR_CONTENT_TYPE
 from stomp.const import HDR_DESTINATION
@@ -7,7 +8,13 @@ from stomp.exc import StompException
 
 
 class Message(object):
-    """A message received through the transport."""
+    """A message received through the transport.
+
+    A :class:`Message` is a view over the ``MESSAGE`` frame it was
+    received in; attributes derived from the headers are parsed when
+    they are first accessed.
+    """
+    __slots__ = ('_connection', '_sub', '_frame', '_destinations')
 
     @property
     def sub(self):
@@ -19,11 +26,32 @@ class Message(object):
 
     @property
     def mid(self):
-        return self._mid
+        return self._frame.headers[HDR_MESSAGE_ID]
 
     @property
     def body(self):
-        return self._body
+        return self._frame.body
+
+    @property
+    def destinations(self):
+        if self._destinations is None:
+            self._destinations = self._connection.split_destinations(
+                self._frame.headers[HDR_DESTINATION])
+        return self._destinations
+
+    @property
+    def content_type(self):
+        return self._frame.headers.get(HDR_CONTENT_TYPE)
+
+    @property
+    def content_length(self):
+        value = self._frame.headers.get(HDR_CONTENT_LENGTH)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise StompException("Invalid content-length header.")
 
     @classmethod
     def fromframe(cls, connection, sub, frame):
@@ -33,41 +61,38 @@ class Message(object):
         assert frame.has_header(HDR_DESTINATION)
         assert frame.has_header(HDR_MESSAGE_ID)
         assert frame.has_header(HDR_SUBSCRIPTION)
-        content_type = frame.headers.get(HDR_CONTENT_TYPE)
-        content_length = None
-        if frame.has_header(HDR_CONTENT_LENGTH):
-            try:
-                content_length = int(frame.headers.get(HDR_CONTENT_LENGTH))
-            except Exception:
-                raise StompException("Invalid content-length header.")
-        return cls(
-            connection,
-            sub,
-            frame,
-            connection.split_destinations(frame.headers[HDR_DESTINATION]),
-            frame.headers[HDR_MESSAGE_ID],
-            frame.body,
-            content_type=content_type,
-            content_length=content_length
-        )
+        return cls(connection, sub, frame)
 
-    def __init__(self, connection, sub, frame, destinations, mid, body, content_type=None,
-        content_length=None):
+    def __init__(self, connection, sub, frame):
         """Initialize a new :class:`Message` instance."""
         self._connection = connection
         self._sub = sub
         self._frame = frame
-        self._mid = mid
-        self._body = body
-        self._content_type = content_type
-        self._content_length = content_length
+        self._destinations = None
 
     def accept(self):
-        """Notify the remote end that the message is accepted."""
+        """Notify the remote end that the message is accepted. If the
+        subscription acknowledges messages in batches, the acknowledgement
+        is sent with the next batch.
+
+        The receipt of the ``ACK`` frame is not waited for, since reading
+        may be paused until the consumer caught up; a future is returned
+        that is resolved when the server confirmed the frame.
+        """
+        acknowledger = getattr(self._sub, 'acknowledger', None)
+        if acknowledger is not None and self._frame.has_header(HDR_ACK):
+            return acknowledger.ack(self._frame)
         if self._frame.ack is not None:
-            self._connection.send_frame(self._frame.ack)
+            return self._connection.send_frame(self._frame.ack, wait=False)
 
     def reject(self):
-        """Notify the remote end that the message is accepted."""
+        """Notify the remote end that the message is rejected. See
+        :meth:`accept`.
+        """
+        # Pending acknowledgements must precede the NACK frame, because
+        # they may be cumulative.
+        acknowledger = getattr(self._sub, 'acknowledger', None)
+        if acknowledger is not None and self._frame.has_header(HDR_ACK):
+            return acknowledger.reject(self._frame)
         if self._frame.nack is not None:
-            self._connection.send_frame(self._frame.nack)
+            return self._connection.send_frame(self._frame.nack, wait=False)
@@ -0,0 +1,111 @@
+import collections
+import itertools
+import threading
+import zlib
+
+from stomp.transport.transport import Transport
+
+
+class TransportPool(object):
+    """Opens `size` connections to the ``STOMP`` server using the same
+    settings and spreads publishing and subscriptions across them.
+
+    Messages are assigned to a transport by the hash of their destination
+    if `strategy` is ``'destination'``, which preserves the ordering of
+    messages sent to the same destination, or in turn if `strategy` is
+    ``'round-robin'``.
+    """
+    transport_class = Transport
+    strategies = ('destination', 'round-robin')
+
+    @property
+    def messages(self):
+        for transport in self.transports:
+            for msg in transport.messages:
+                yield msg
+
+    def __init__(self, settings, size=4, strategy='destination'):
+        if size < 1:
+            raise ValueError("A TransportPool needs at least one connection.")
+        if strategy not in self.strategies:
+            raise ValueError("Unknown strategy: {0}".format(strategy))
+        self.settings = settings
+        self.strategy = strategy
+        self.transports = [self.transport_class(settings)
+            for _ in range(size)]
+        self.lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self.transports)
+
+    def start(self):
+        """Connect all transports to the ``STOMP`` server."""
+        for transport in self.transports:
+            transport.start()
+
+    def stop(self):
+        """Stop all transports and disconnect from the server."""
+        for transport in self.transports:
+            transport.stop()
+
+    def select(self, destinations):
+        """Return the :class:`~stomp.transport.Transport` that publishes
+        messages to `destinations`.
+        """
+        if self.strategy == 'destination':
+            destination = self.transports[0].connection\
+                .join_destination(destinations)
+            n = zlib.crc32(destination.encode('utf-8')) & 0xffffffff
+        else:
+            with self.lock:
+                n = next(self._counter)
+        return self.transports[n % len(self.transports)]
+
+    def send(self, destinations, content_type, body, headers=None,
+        receipt=False):
+        """Send a message through one of the pooled transports. See
+        :meth:`stomp.transport.Transport.send`.
+        """
+        return self.select(destinations).send(destinations, content_type,
+            body, headers=headers, receipt=receipt)
+
+    def send_many(self, messages, receipt=False):
+        """Send multiple messages, grouped per transport. Messages that
+        are assigned to the same transport are sent in order. See
+        :meth:`stomp.transport.Transport.send_many`.
+        """
+        groups = collections.OrderedDict()
+        for args in messages:
+            transport = self.select(args[0])
+            groups.setdefault(id(transport), (transport, []))[1].append(args)
+        return sum(transport.send_many(batch, receipt=receipt)
+            for transport, batch in groups.values())
+
+    def prepare_send(self, destinations, content_type, headers=None):
+        """Return a :class:`~stomp.transport.prepared.PreparedSend` bound
+        to the transport selected for `destinations`.
+        """
+        return self.select(destinations).prepare_send(destinations,
+            content_type, headers=headers)
+
+    def subscribe(self, destinations, **opts):
+        """Subscribe to `destinations` on the transport holding the least
+        subscriptions. See :meth:`stomp.transport.Transport.subscribe`.
+        """
+        transport = min(self.transports,
+            key=lambda t: len(list(t.session.subscriptions)))
+        return transport.subscribe(destinations, **opts)
+
+    def unsubscribe_all(self):
+        """Send an ``UNSUBSCRIBE`` frame for all subscriptions."""
+        for transport in self.transports:
+            transport.unsubscribe_all()
+
+    def stats(self):
+        """Return the statistics of all connections in the pool, summed."""
+        totals = collections.Counter()
+        for transport in self.transports:
+            totals.update(transport.connection.stats)
+        totals['connections'] = len(self.transports)
+        return dict(totals)
@@ -0,0 +1,58 @@
+import uuid
+
+from stomp.compat import buffer_types
+from stomp.const import HDR_CONTENT_LENGTH
+from stomp.const import HDR_CONTENT_TYPE
+from stomp.const import HDR_DESTINATION
+from stomp.const import HDR_RECEIPT
+from stomp.const import SEND
+
+
+class PreparedSend(object):
+    """A ``SEND`` frame template for a destination that is published to
+    frequently. The constant part of the header block is encoded once;
+    publishing a message only appends the ``content-length`` header, an
+    optional ``receipt`` header and the body.
+    """
+
+    def __init__(self, connection, destinations, content_type, headers=None):
+        """Initialize a new :class:`PreparedSend` instance.
+
+        Args:
+            connection: a :class:`~stomp.transport.Connection` instance.
+            destinations: a string specifying a single destination; or a
+                list holding multiple destinations.
+            content_type: the content type of the message bodies.
+            headers: a dictionary holding additional headers.
+        """
+        codec = connection.codec
+        headers = list((headers or {}).items())
+        headers.extend([
+            (HDR_CONTENT_TYPE, content_type),
+            (HDR_DESTINATION, connection.join_destination(destinations))
+        ])
+        self.connection = connection
+        self.encoding = codec.encoding
+        self.eol = codec.eol
+        self.head = codec.encode_head(SEND, headers)\
+            + (HDR_CONTENT_LENGTH + ':').encode(self.encoding)
+        self.receipt = (HDR_RECEIPT + ':').encode(self.encoding)
+
+    def encode(self, body, receipt_id=None):
+        """Return the encoded ``SEND`` frame for `body` as a list of
+        buffers.
+        """
+        if not isinstance(body, buffer_types):
+            body = body.encode(self.encoding)
+        head = self.head + str(len(body)).encode('ascii') + self.eol
+        if receipt_id is not None:
+            head += self.receipt + receipt_id.encode(self.encoding) + self.eol
+        return [head + self.eol, body, b'\x00']
+
+    def send(self, body, receipt=False):
+        """Publish a message with the given `body`. If `receipt` is
+        ``True``, block until the ``STOMP`` server confirms the frame.
+        """
+        receipt_id = uuid.uuid4().hex if receipt else None
+        return self.connection.send_encoded(
+            self.encode(body, receipt_id), receipt_id)
@@ -0,0 +1,179 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from multiprocessing import resource_tracker
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+def _invoke(handler, headers, body, shm_name=None, size=None):
+    # Runs in the worker process. Large bodies are read from a shared
+    # memory block created by the consuming process, which also removes
+    # the block once the handler returned.
+    if shm_name is not None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            body = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+    return handler(headers, body)
+
+
+class ProcessDispatcher(object):
+    """Invokes a handler for each message received by a subscription in
+    a pool of worker processes, so that CPU-bound handlers are not
+    limited by the interpreter lock.
+
+    The handler must be a picklable callable accepting the headers and
+    the body of a message. If it returns ``True``, the message is
+    accepted; if it returns ``False``, the message is rejected. The
+    ``ACK`` and ``NACK`` frames are sent by the consuming process on the
+    connection that received the message, from a dedicated thread, since
+    they may wait for a receipt. Bodies of at least `threshold` bytes are
+    passed to the workers through shared memory instead of being pickled.
+
+    When `maxsize` messages are being handled, the `pause` callable bound
+    with :meth:`bind` is invoked, e.g. to stop reading from the socket;
+    the `resume` callable is invoked once half of them were completed.
+
+    Args:
+        handler: a picklable callable accepting two arguments, the
+            headers and the body of the message.
+        processes: the number of worker processes.
+        maxsize: the number of messages being handled at which the
+            receiving of messages is paused.
+        threshold: the minimum body size, in bytes, for which shared
+            memory is used.
+    """
+
+    def __init__(self, handler, processes=None, maxsize=1000,
+        threshold=65536):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.executor = ProcessPoolExecutor(processes)
+        self.logger = logging.getLogger('stomp.dispatcher')
+        self.pending = 0
+        self._pause = self._resume = None
+        self._paused = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # The results are passed from the executor's management thread to
+        # this thread, which sends the ACK and NACK frames.
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.__main__)
+        self.thread.daemon = True
+        self.thread.start()
+        if shared_memory is not None:
+            # Workers must share the resource tracker of this process;
+            # otherwise they would unlink the shared memory blocks that
+            # they attached to when exiting.
+            resource_tracker.ensure_running()
+
+    def bind(self, pause, resume):
+        """Invoke the callable `pause` when too many messages are being
+        handled, and `resume` when the workers caught up.
+        """
+        self._pause = pause
+        self._resume = resume
+
+    def put(self, msg):
+        """Submit `msg` to the worker processes. Messages received after
+        the dispatcher was closed are dropped without acknowledging them,
+        so that the server delivers them again.
+        """
+        with self._cond:
+            if self._closed:
+                self.logger.debug("Dropping message received after close")
+                return
+            self.pending += 1
+            pause = self.maxsize and not self._paused\
+                and self.pending >= self.maxsize
+            if pause:
+                self._paused = True
+        if pause and self._pause is not None:
+            self._pause()
+
+        shm = None
+        body = msg.body
+        args = [self.handler, dict(msg.headers)]
+        try:
+            if shared_memory is not None and len(body) >= self.threshold:
+                shm = shared_memory.SharedMemory(create=True, size=len(body))
+                shm.buf[:len(body)] = body
+                args.extend([None, shm.name, len(body)])
+            else:
+                args.append(body)
+            future = self.executor.submit(_invoke, *args)
+        except RuntimeError:
+            # The executor was shut down concurrently.
+            self._release(shm)
+            self._finished()
+            self.logger.debug("Dropping message received after close")
+            return
+        except Exception:
+            self._release(shm)
+            self._finished()
+            raise
+        future.add_done_callback(lambda f: self._done(f, msg, shm))
+
+    def join(self):
+        """Block until all pending messages are handled."""
+        with self._cond:
+            while self.pending:
+                self._cond.wait()
+
+    def close(self, wait=True):
+        """Stop the worker processes after the pending messages are
+        handled. If `wait` is ``True``, block until they have exited and
+        their results were acknowledged.
+        """
+        with self._cond:
+            self._closed = True
+        self.executor.shutdown(wait)
+        self.results.put(None)
+        if wait and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def _done(self, future, msg, shm):
+        # Invoked by the executor; must not block.
+        self._release(shm)
+        self.results.put((future, msg))
+
+    def __main__(self):
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            try:
+                self._complete(*item)
+            except Exception:
+                self.logger.exception("Unhandled exception in message handler")
+            finally:
+                self._finished()
+
+    def _complete(self, future, msg):
+        result = future.result()
+        if result is True:
+            msg.accept()
+        elif result is False:
+            msg.reject()
+
+    def _finished(self):
+        with self._cond:
+            self.pending -= 1
+            resume = self._paused and self.pending <= self.maxsize // 2
+            if resume:
+                self._paused = False
+            self._cond.notify_all()
+        if resume and self._resume is not None:
+            self._resume()
+
+    def _release(self, shm):
+        if shm is not None:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,119 @@
+import threading
+import time
+
+
+class BatchProducer(object):
+    """Publishes messages through a :class:`~stomp.transport.Transport`
+    in batches. Messages are encoded immediately and buffered until
+    `max_bytes` bytes are pending or the oldest pending message has
+    waited `linger` milliseconds; the batch is then written to the socket
+    with a single call.
+
+    A :class:`BatchProducer` can be used as a context-manager, which
+    flushes the pending messages on exit.
+    """
+
+    @property
+    def pending(self):
+        """The number of messages that were not sent yet."""
+        return self._count
+
+    def __init__(self, transport, linger=5, max_bytes=65536):
+        self.transport = transport
+        self.connection = transport.connection
+        self.linger = linger
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.batches = 0
+
+        self._segments = []
+        self._count = 0
+        self._size = 0
+        self._deadline = None
+        self._closed = False
+        self._error = None
+        self.thread = threading.Thread(target=self.__main__)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def send(self, destinations, content_type, body, headers=None):
+        """Add a message to the current batch. See
+        :meth:`stomp.transport.Transport.send`.
+        """
+        frame = self.transport.get_send_frame(destinations, content_type,
+            body, headers=headers)
+        self.connection.notify_observers(self.connection.EVNT_FRAME_SENT,
+            frame=frame)
+        segments = self.connection.codec.encode_segments(*frame)
+        with self.lock:
+            if self._error is not None:
+                raise self._error
+            if self._closed:
+                raise RuntimeError("BatchProducer is closed.")
+            self._segments.extend(segments)
+            self._count += 1
+            self._size += sum(len(s) for s in segments)
+            full = self._size >= self.max_bytes
+            if not full and self._deadline is None:
+                self._deadline = time.monotonic() + self.linger / 1000.0
+                self.condition.notify()
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Send all pending messages."""
+        # Batches are taken and sent under the same lock, so that they
+        # are sent in order.
+        with self.flush_lock:
+            with self.lock:
+                count = self._count
+                batch = self._take()
+            if batch:
+                self.connection.send(batch, count)
+                self.batches += 1
+
+    def close(self):
+        """Send all pending messages and stop the background thread."""
+        with self.lock:
+            self._closed = True
+            self.condition.notify()
+        self.thread.join()
+        self.flush()
+
+    def _take(self):
+        batch, self._segments = self._segments, []
+        self._count = self._size = 0
+        self._deadline = None
+        return batch
+
+    def __main__(self):
+        # Send the pending messages when the linger time of the oldest
+        # message passed.
+        while True:
+            with self.lock:
+                while not self._closed:
+                    if self._deadline is None:
+                        self.condition.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self._closed:
+                    break
+
+            try:
+                self.flush()
+            except Exception as e:
+                with self.lock:
+                    self._error = e
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
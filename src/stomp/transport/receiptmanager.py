@@ -1,48 +1,190 @@
+import heapq
+import itertools
+import logging
 import threading
+import time
+from concurrent.futures import Future
 
+from stomp.const import HDR_RECEIPT_ID
 from stomp.const import RECEIPT
-from stomp.const import SEND
 from stomp.exc import FrameNotConfirmed
 
 
 class ReceiptManager(object):
+    """Keeps track of the frames that await a ``RECEIPT`` frame from the
+    server.
 
-    def __init__(self, connection):
+    Each frame is represented by a :class:`~concurrent.futures.Future`
+    that is resolved when the receipt arrives, or fails with
+    :exc:`~stomp.exc.FrameNotConfirmed` when its deadline passes. The
+    deadlines are kept in a heap, so that the I/O loop only has to
+    inspect the earliest one; entries of confirmed frames are removed
+    from the heap lazily. The deadlines use a monotonic clock, so that
+    changes of the system time do not affect them.
+
+    If the encoded `data` of a frame is registered, the frame can be sent
+    again after the connection was reestablished, see :meth:`unconfirmed`.
+    """
+
+    @property
+    def in_flight(self):
+        """The number of frames awaiting a receipt."""
+        return len(self.pending)
+
+    def __init__(self, connection, window=0, clock=time.monotonic):
         self.connection = connection
-        connection.register_observer(self)
-        self.receipts = {}
+        self.clock = clock
+        connection.register_handler(RECEIPT, self.receipt_received)
         self.lock = threading.Lock()
+        self.logger = logging.getLogger('stomp.receipts')
+        self.pending = {}
+        self.deadlines = []
+        self.window = threading.BoundedSemaphore(window) if window else None
+        self._seq = itertools.count()
+
+    def expect(self, receipt_id, timeout, data=None):
+        """Register a frame that is sent with the given `receipt_id` and
+        return a :class:`~concurrent.futures.Future` that is resolved when
+        the ``RECEIPT`` frame arrives, or fails after `timeout`
+        milliseconds.
+        """
+        return self._register(receipt_id, timeout, False, data)
+
+    def submit(self, receipt_id, timeout, data=None):
+        """Like :meth:`expect`, but for pipelined frames: block while the
+        window of unconfirmed frames is full.
+        """
+        self.window.acquire()
+        return self._register(receipt_id, timeout, True, data)
+
+    def _register(self, receipt_id, timeout, windowed, data):
+        future = Future()
+        deadline = self.clock() + timeout / 1000.0
+        seq = next(self._seq)
+        with self.lock:
+            replaced = self.pending.get(receipt_id)
+            self.pending[receipt_id] = [seq, future, windowed, data, False]
+            first = not self.deadlines or deadline < self.deadlines[0][0]
+            heapq.heappush(self.deadlines, (deadline, seq, receipt_id))
+            self._compact()
+
+        if replaced is not None:
+            self._resolve(replaced, exception=FrameNotConfirmed(receipt_id))
+
+        # If the deadline precedes all others, the I/O loop is not aware
+        # of it yet.
+        if first:
+            self.connection.wakeup()
+        return future
+
+    def timeout(self):
+        """Return the number of seconds until the first frame expires, or
+        ``None`` if no frames are pending.
+        """
+        with self.lock:
+            self._discard_confirmed()
+            if not self.deadlines:
+                return None
+            deadline = self.deadlines[0][0]
+        return max(deadline - self.clock(), 0)
+
+    def expire(self):
+        """Fail all frames of which the deadline has passed."""
+        now = self.clock()
+        expired = []
+        with self.lock:
+            while self.deadlines and self.deadlines[0][0] <= now:
+                _, seq, receipt_id = heapq.heappop(self.deadlines)
+                entry = self.pending.get(receipt_id)
+                if entry is not None and entry[0] == seq:
+                    del self.pending[receipt_id]
+                    expired.append((receipt_id, entry))
+        for receipt_id, entry in expired:
+            self._resolve(entry, exception=FrameNotConfirmed(receipt_id))
+
+    def written(self, receipt_ids):
+        """Mark the frames identified by `receipt_ids` as written to the
+        socket.
+        """
+        with self.lock:
+            for receipt_id in receipt_ids:
+                entry = self.pending.get(receipt_id)
+                if entry is not None:
+                    entry[4] = True
 
-    def wait(self, receipt_id, timeout=None):
-        """Block until a ``RECEIPT`` frame with the given ``receipt_id`` is
-        received or `timeout` is reached.
+    def unconfirmed(self):
+        """Return a list holding the encoded data of the frames that were
+        written to the socket but not confirmed, in the order they were
+        sent.
         """
-        if timeout is not None:
-            timeout = int(timeout / 1000)
-        if not self.receipts[receipt_id].wait(timeout):
-            raise FrameNotConfirmed
+        with self.lock:
+            entries = sorted(e for e in self.pending.values()
+                if e[4] and e[3] is not None)
+        return [e[3] for e in entries]
 
-        return True
+    def renew(self, timeout):
+        """Set the deadline of all pending frames to `timeout` milliseconds
+        from now.
+        """
+        deadline = self.clock() + timeout / 1000.0
+        with self.lock:
+            self.deadlines = [(deadline, e[0], receipt_id)
+                for receipt_id, e in self.pending.items()]
+            heapq.heapify(self.deadlines)
 
-    def notify(self, event, frame, **params):
-        """Notify the :class:`ReceiptManager` manager that a certain
-        event has occurred.
+    def cancel(self, receipt_id, exception):
+        """Fail the frame identified by `receipt_id` with `exception`, e.g.
+        because it could not be sent.
         """
-        if event not in (self.connection.EVNT_FRAME_RECV, self.connection.EVNT_FRAME_SENT):
+        with self.lock:
+            entry = self.pending.pop(receipt_id, None)
+        if entry is not None:
+            self._resolve(entry, exception=exception)
+
+    def fail(self, exception):
+        """Fail all pending frames with `exception`."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.deadlines = []
+        for entry in pending.values():
+            self._resolve(entry, exception=exception)
+
+    def receipt_received(self, frame):
+        """Confirm the frame for which the ``RECEIPT`` frame `frame`
+        was sent. Receipts for unknown or expired frames are ignored.
+        """
+        receipt_id = frame.headers.get(HDR_RECEIPT_ID)
+        with self.lock:
+            entry = self.pending.pop(receipt_id, None)
+        if entry is None:
+            self.logger.debug("Ignoring unknown receipt {0}".format(receipt_id))
+            return
+        self._resolve(entry, result=True)
+
+    def _discard_confirmed(self):
+        # Pop the entries of confirmed frames from the top of the heap, so
+        # that the first entry is the earliest pending deadline.
+        while self.deadlines:
+            _, seq, receipt_id = self.deadlines[0]
+            entry = self.pending.get(receipt_id)
+            if entry is not None and entry[0] == seq:
+                break
+            heapq.heappop(self.deadlines)
+
+    def _compact(self):
+        # Rebuild the heap if it mostly holds entries of confirmed frames,
+        # so that its size is bounded by the number of pending frames.
+        if len(self.deadlines) <= 2 * len(self.pending) + 64:
             return
+        self.deadlines = [d for d in self.deadlines
+            if self.pending.get(d[2], (None,))[0] == d[1]]
+        heapq.heapify(self.deadlines)
 
-        if (frame.command == RECEIPT) and event == self.connection.EVNT_FRAME_RECV:
-            # If the receipt is in our registry, fire the event indicating
-            # listeners that the receipt has been received.
-            receipt_id = frame.headers.get('receipt-id')
-            with self.lock:
-                event = self.receipts.pop(receipt_id)
-                event.set()
-            raise self.connection.DiscardFrame
-
-        # On SEND frames, if a receipt was specified in the headers,
-        # create an event for it so that listeners can block until
-        # the confirmation from the STOMP server arrives.
-        if (frame.expects_receipt())\
-        and (event == self.connection.EVNT_FRAME_SENT):
-            self.receipts[frame.receipt_id] = threading.Event()
+    def _resolve(self, entry, result=None, exception=None):
+        _, future, windowed, _, _ = entry
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+        if windowed:
+            self.window.release()
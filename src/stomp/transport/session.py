@@ -1,12 +1,19 @@
+import functools
 import logging
 import uuid
 
+from stomp.const import ACK_CLIENT
+from stomp.const import ACK_INDIVIDUAL
 from stomp.const import HDR_ACK
 from stomp.const import HDR_ID
 from stomp.const import HDR_DESTINATION
 from stomp.const import HDR_HEARBEAT
+from stomp.const import HDR_PREFETCH
 from stomp.const import HDR_VERSION
 from stomp.frames import SubscribeFrame
+from stomp.transport.ack import BatchAcknowledger
+from stomp.transport.dispatcher import Dispatcher
+from stomp.transport.processpool import ProcessDispatcher
 from stomp.transport.subscriptions import SubscriptionManager
 
 
@@ -14,6 +21,7 @@ class Session(object):
     """Represents a session with the ``STOMP`` server, established
     with the ``CONNECTED`` frame.
     """
+    subscription_manager_class = SubscriptionManager
 
     @classmethod
     def fromframe(cls, connection, frame):
@@ -33,10 +41,11 @@ class Session(object):
             connection: a :class:`~stomp.transport.Connection` instance.
             version: the ``STOMP`` protocol version that will be used
                 in this session.
-            send_hb: an unsigned integer indicating the frequency at
-                which the client must send heartbeats.
-            recv_hb: an unsigned integer indicating the frequency at
-                which the server will send heartbeats.
+            send_hb: the interval, in milliseconds, at which the server
+                can send heartbeats, as specified in the ``CONNECTED``
+                frame.
+            recv_hb: the interval, in milliseconds, at which the server
+                wants to receive heartbeats.
             **extra: extra parameters sent by the server.
         """
         self.connection = connection
@@ -44,7 +53,7 @@ class Session(object):
         self.send_hb = send_hb
         self.recv_hb = recv_hb
         self.params = extra or {}
-        self.subscriptions = SubscriptionManager(self, self.connection,
+        self.subscriptions = self.subscription_manager_class(self, self.connection,
             message_factory=connection.message_factory)
         self.logger = logging.getLogger('stomp.session')
 
@@ -58,6 +67,35 @@ class Session(object):
             ack_mode: specifies the acknowledgement mode
                 for incoming frames. Must be one of ``auto``,
                 ``client`` or ``client-individual``.
+            handler: a callable invoked for each received message
+                on a pool of worker threads, instead of queueing
+                the messages on the :class:`Subscription`.
+            workers: the number of threads invoking `handler`.
+            order_key: the name of a header, or a callable returning
+                a key for a message. Messages with the same key are
+                handled in order. Defaults to the destination.
+            max_pending: the number of messages queued for a worker
+                at which reading from the socket is paused. Reading is
+                resumed when the workers are down to half of it.
+            processes: if given, invoke `handler` in this number of
+                worker processes instead of threads. See
+                :class:`~stomp.transport.processpool.ProcessDispatcher`.
+            prefetch: the maximum number of messages queued by the
+                subscription before reading from the socket is paused.
+                Also sent to the server as a prefetch header.
+            low_water: the number of queued messages below which
+                reading is resumed. Defaults to half of `prefetch`.
+            ack_batch: if given, acknowledge accepted messages in
+                batches of this size instead of one by one. Only
+                applies to the ``client`` and ``client-individual``
+                acknowledgement modes.
+            ack_interval: the maximum number of milliseconds an
+                accepted message waits for its batch. Defaults to 100.
+            dedup_window: the number of message identifiers remembered
+                to drop redelivered messages. Defaults to 1000; ``0``
+                disables duplicate detection.
+            dedup_max_age: if given, forget message identifiers after
+                this number of milliseconds.
 
         Returns:
             :class:`Subscription`
@@ -65,27 +103,66 @@ class Session(object):
         if not isinstance(destinations, list):
             destinations = [destinations]
 
-        # Use an exclusive lock on the connection so we can check
-        # if the SUBSCRIBE frame leads to an ERROR. In that case,
-        # do not add the subscription to the registry so all
-        # subscriptions can always be restored when the connection
-        # is reestablished.
-        sid = kwargs.pop('_sid', uuid.uuid4().hex)
+        dispatcher = None
+        handler = kwargs.pop('handler', None)
+        options = dict((k, kwargs.pop(k)) for k in ('workers', 'order_key',
+            'max_pending', 'processes', 'low_water', 'dedup_window',
+            'dedup_max_age') if k in kwargs)
+        prefetch = kwargs.pop('prefetch', None)
+        ack_batch = kwargs.pop('ack_batch', None)
+        ack_interval = kwargs.pop('ack_interval', 100)
+        if handler is not None and 'processes' in options:
+            dispatcher = ProcessDispatcher(handler,
+                processes=options['processes'],
+                maxsize=options.get('max_pending', 1000))
+        elif handler is not None:
+            dispatcher = Dispatcher(handler,
+                workers=options.get('workers', 4),
+                order_key=options.get('order_key'),
+                maxsize=options.get('max_pending', 1000))
 
-        headers = self.get_subscription_headers(sid, destinations, **kwargs)
-        frame = SubscribeFrame(list(headers.items()))
-        with self.connection.claim():
-            self.connection.send_frame(frame)
-            self.connection.update()
+        sid = kwargs.pop('_sid', uuid.uuid4().hex)
+        headers = self.get_subscription_headers(sid, destinations,
+            prefetch=prefetch, **kwargs)
+        frame = SubscribeFrame(list(headers.items()), with_receipt=True)
+
+        acknowledger = None
+        if ack_batch and kwargs.get('ack_mode') in (ACK_CLIENT, ACK_INDIVIDUAL):
+            acknowledger = BatchAcknowledger(self.connection,
+                kwargs['ack_mode'], batch=ack_batch, interval=ack_interval)
+
+        # Register the subscription before sending the frame, because
+        # messages may arrive before the receipt. If the server rejects
+        # the subscription, remove it again, so that all subscriptions
+        # in the registry can be restored when the connection is
+        # reestablished.
+        sub = self.subscriptions.add(sid, destinations, dispatcher=dispatcher,
+            prefetch=prefetch, low_water=options.get('low_water'),
+            acknowledger=acknowledger,
+            dedup_window=options.get('dedup_window', 1000),
+            dedup_max_age=options.get('dedup_max_age'), headers=headers)
+        if dispatcher is not None:
+            dispatcher.bind(
+                functools.partial(self.connection.pause_reading, sub),
+                functools.partial(self.connection.resume_reading, sub))
+
+        # The frame is never sent again, even if retries are enabled: a
+        # server that processed it already would reject the duplicate id.
+        try:
+            future = self.connection.send_frame(frame, wait=False)
+            self.connection.wait_receipt(future)
+        except Exception:
+            self.subscriptions.discard(sid)
+            raise
 
-        sub = self.subscriptions.add(sid, destinations)
         _ = (sid, frame.headers[HDR_DESTINATION])
         self.logger.info(
             "Subscribed to {1} (id={0})".format(*_))
 
         return sub
 
-    def get_subscription_headers(self, sid, destinations, ack_mode=None, **kwargs):
+    def get_subscription_headers(self, sid, destinations, ack_mode=None,
+        prefetch=None, **kwargs):
         headers = kwargs.pop('extra_headers', None) or {}
         headers.update({
             HDR_ID: sid,
@@ -93,6 +170,8 @@ class Session(object):
         })
         if ack_mode is not None:
             headers[HDR_ACK] = ack_mode
+        if prefetch:
+            headers.update((k, str(prefetch)) for k in HDR_PREFETCH)
         return headers
 
     def __repr__(self):
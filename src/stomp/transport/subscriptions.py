@@ -1,69 +1,103 @@
 import collections
 import logging
+import queue
 import threading
-try:
-    import queue
-except ImportError:
-    import Queue as queue
 
 from stomp.const import MESSAGE
+from stomp.const import HDR_DESTINATION
 from stomp.const import HDR_ID
 from stomp.const import HDR_SUBSCRIPTION
+from stomp.frames import SubscribeFrame
 from stomp.frames import UnsubscribeFrame
+from stomp.transport.dedup import DuplicateIndex
 from stomp.transport.message import Message
 
 
 class SubscriptionManager(object):
     """Manages subscriptions for a session with a ``STOMP`` server."""
 
+    subscription_class = None
+
     def __init__(self, session, connection, message_factory=None):
         self.session = session
         self.connection = connection
-        connection.register_observer(self)
+        connection.register_handler(MESSAGE, self.route)
         self.subscriptions = collections.OrderedDict()
         self.logger = logging.getLogger('stomp.session')
         self.message_factory = message_factory or Message.fromframe
 
-    def add(self, sid, destinations):
+    def add(self, sid, destinations, **kwargs):
         """Register a new subscription."""
         assert sid not in self.subscriptions
-        self.subscriptions[sid] = Subscription(
-            self, sid, destinations)
+        self.subscriptions[sid] = self.subscription_class(
+            self, sid, destinations, **kwargs)
         return self.subscriptions[sid]
 
-    def notify(self, event, frame, *args, **kwargs):
-        c = self.connection
-        if event == c.EVNT_FRAME_RECV and frame.is_message():
-            assert frame.command == MESSAGE
-            assert frame.has_header(HDR_SUBSCRIPTION)
-            assert frame.headers[HDR_SUBSCRIPTION] in self.subscriptions
-
-            sid = frame.headers[HDR_SUBSCRIPTION]
-            self.subscriptions[sid].put(
-                self.message_factory(self.connection, self, frame)
-            )
-            raise c.DiscardFrame
-
-        # if event == c.EVNT_RECONNECT:
-        #     # On reconnect, re-subscribe for all subscriptions.
-        #     for sub in self.subscriptions.values():
-        #         sub.create(self.session.subscribe)
+    def route(self, frame):
+        """Pass the ``MESSAGE`` frame `frame` to the subscription it was
+        received for.
+        """
+        assert frame.has_header(HDR_SUBSCRIPTION)
+
+        # Messages may still arrive for a subscription that was
+        # destroyed, until the server processed the UNSUBSCRIBE frame.
+        sid = frame.headers[HDR_SUBSCRIPTION]
+        sub = self.subscriptions.get(sid)
+        if sub is None:
+            self.logger.debug(
+                "Discarding message for unknown subscription {0}".format(sid))
+            return
+        sub.put(self.message_factory(self.connection, sub, frame))
 
     def destroy(self, sid):
         """Destroy the :class:`Subscription` identified by `sid` and stop
         receiving messages for it.
         """
-        if sid in self.subscriptions:
-            sub = self.subscriptions.pop(sid)
-            self.connection.send_frame(sub.unsubscribe_frame)
-        
+        sub = self.discard(sid)
+        if sub is not None:
+            return self.connection.send_frame(sub.unsubscribe_frame)
+
+    def discard(self, sid):
+        """Remove the :class:`Subscription` identified by `sid` from the
+        registry without notifying the server, e.g. because the server
+        rejected it. Return the subscription, or ``None`` if it is not
+        registered.
+        """
+        sub = self.subscriptions.pop(sid, None)
+        if sub is not None:
+            self.connection.resume_reading(sub)
+            if sub.dispatcher is not None:
+                sub.dispatcher.close()
+            if sub.acknowledger is not None:
+                sub.acknowledger.close()
+        return sub
 
     def __iter__(self):
         return iter(self.subscriptions.values())
 
 
 class Subscription(object):
-    """Represents a subscription to one or more channels."""
+    """Represents a subscription to one or more channels.
+
+    If `prefetch` is specified, reading from the socket is paused when
+    `prefetch` messages are queued and resumed when the consumer took
+    enough messages to reach `low_water`, which defaults to half of
+    `prefetch`.
+
+    If an `acknowledger` is specified, accepted messages are acknowledged
+    in batches, see :class:`~stomp.transport.ack.BatchAcknowledger`.
+
+    Messages of which the identifier is among the last `dedup_window`
+    received identifiers, or received within `dedup_max_age` milliseconds
+    if specified, are dropped as duplicates.
+    """
+
+    @property
+    def subscribe_frame(self):
+        """The ``SUBSCRIBE`` frame that creates this subscription, used to
+        restore it when the connection is reestablished.
+        """
+        return SubscribeFrame(list(self.headers.items()))
 
     @property
     def unsubscribe_frame(self):
@@ -79,33 +113,60 @@ class Subscription(object):
     def frame_count(self):
         return self._frame_count
 
+    @property
+    def duplicates(self):
+        """The number of redelivered messages that were dropped."""
+        return self.seen.duplicates
+
+    @property
+    def depth(self):
+        """The number of messages waiting to be consumed."""
+        return self.queue.qsize()
+
     @property
     def messages(self):
         """Return all messages received by this subscription."""
         while True:
             try:
-                yield self.queue.get(False)
+                msg = self.queue.get(False)
             except queue.Empty:
                 break
-            else:
-                self.queue.task_done()
-
-    def __init__(self, manager, sid, destinations):
+            self.queue.task_done()
+            if self.prefetch and self.queue.qsize() <= self.low_water:
+                self.manager.connection.resume_reading(self)
+            yield msg
+
+    def __init__(self, manager, sid, destinations, dispatcher=None,
+        prefetch=None, low_water=None, acknowledger=None, dedup_window=1000,
+        dedup_max_age=None, headers=None):
         self.manager = manager
         self.sid = sid
         self.destinations = destinations
+        self.headers = headers or {HDR_ID: sid,
+            HDR_DESTINATION: manager.connection.join_destination(destinations)}
+        self.dispatcher = dispatcher
+        self.acknowledger = acknowledger
+        self.prefetch = prefetch
+        self.low_water = low_water if low_water is not None\
+            else (prefetch or 0) // 2
         self.queue = queue.Queue()
-        self.seen = collections.deque([], 1000)
+        self.seen = DuplicateIndex(dedup_window, max_age=dedup_max_age)
         self._messages_received = 0
         self._frame_count = 0
         self._events = collections.OrderedDict()
 
     def put(self, msg):
         self._frame_count += 1
-        if msg.mid not in self.seen:
+        if self.seen.add(msg.mid):
             self._messages_received += 1
-            self.seen.append(msg.mid)
-            self.queue.put(msg)
+            if self.acknowledger is not None:
+                self.acknowledger.delivered(msg)
+            if self.dispatcher is not None:
+                self.dispatcher.put(msg)
+                return
+            self.queue.put_nowait(msg)
+            if self.prefetch and self.queue.qsize() >= self.prefetch:
+                self.manager.connection.pause_reading(self)
             if self._events:
                 self._events.pop(list(self._events.keys())[0]).set()
 
@@ -128,3 +189,6 @@ class Subscription(object):
 
     def __iter__(self):
         return iter(self.messages)
+
+
+SubscriptionManager.subscription_class = Subscription
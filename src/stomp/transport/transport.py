@@ -1,10 +1,17 @@
+import uuid
+
+from stomp.const import HDR_RECEIPT
+from stomp.frames import SendFrame
 from stomp.transport.connection import Connection
+from stomp.transport.prepared import PreparedSend
+from stomp.transport.producer import BatchProducer
 
 
 class Transport(object):
     """Represents the transport between the server and the client and
     exposes all methods of the ``STOMP`` protocol.
     """
+    connection_class = Connection
 
     @property
     def messages(self):
@@ -14,7 +21,7 @@ class Transport(object):
 
     def __init__(self, settings):
         self.settings = settings
-        self.connection = Connection(settings)
+        self.connection = self.connection_class(settings)
         self.session = None
 
     def start(self):
@@ -35,9 +42,12 @@ class Transport(object):
             ack_mode: specifies the acknowledgement mode
                 for incoming frames. Must be one of ``auto``,
                 ``client`` or ``client-individual``.
+            handler: a callable invoked for each received message
+                on a pool of worker threads. See :meth:`stomp.transport.
+                session.Session.subscribe` for the related options.
 
         Returns:
-            None
+            :class:`~stomp.transport.subscriptions.Subscription`
         """
         return self.session.subscribe(destinations, **opts)
 
@@ -48,11 +58,48 @@ class Transport(object):
 
     def send(self, destinations, content_type, body, headers=None,
         receipt=False):
-        from stomp.frames import SendFrame
+        frame = self.get_send_frame(destinations, content_type, body,
+            headers=headers, receipt=receipt)
+        return self.connection.send_frame(frame)
+
+    def send_many(self, messages, receipt=False):
+        """Send multiple messages with as few system calls as possible.
+
+        Args:
+            messages: an iterable yielding tuples holding the positional
+                arguments to :meth:`send`, e.g. ``(destinations,
+                content_type, body)`` or ``(destinations, content_type,
+                body, headers)``.
+            receipt: if ``True``, request a receipt for the last message,
+                which confirms the complete batch.
+        """
+        frames = [self.get_send_frame(*args) for args in messages]
+        if frames and receipt:
+            frames[-1].set_header(HDR_RECEIPT, uuid.uuid4().hex)
+        return self.connection.send_frames(frames)
+
+    def producer(self, linger=5, max_bytes=65536):
+        """Return a :class:`~stomp.transport.producer.BatchProducer` that
+        coalesces messages and sends them in batches of at most `max_bytes`
+        bytes, or after `linger` milliseconds.
+        """
+        return BatchProducer(self, linger=linger, max_bytes=max_bytes)
+
+    def get_send_frame(self, destinations, content_type, body, headers=None,
+        receipt=False):
         headers = list((headers or {}).items())
         headers.extend([
             ('content-type', content_type),
             ('destination', self.connection.join_destination(destinations))
         ])
-        frame = SendFrame(headers, body, with_receipt=receipt)
-        self.connection.send_frame(frame)
+        return SendFrame(headers, body, with_receipt=receipt)
+
+    def prepare_send(self, destinations, content_type, headers=None):
+        """Return a :class:`~stomp.transport.prepared.PreparedSend` that
+        publishes messages to `destinations` with the given `content_type`
+        and `headers`. The constant headers are encoded only once, which
+        makes it the fastest way to publish many messages to the same
+        destination.
+        """
+        return PreparedSend(self.connection, destinations, content_type,
+            headers=headers)
@@ -38,3 +38,20 @@ class EncodingTestCase(unittest.TestCase):
         codec = Codec()
         body = "Hello world!"
         raw = codec.encode(SEND, [], body=body)
+
+    def test_content_length_counts_encoded_octets(self):
+        body = "H\u00e9llo world!"
+        encoded = self.codec.encode(SEND, [], body=body)
+        length = len(body.encode('utf-8'))
+        self.assertIn('content-length:{0}'.format(length).encode(), encoded)
+
+    def test_encode_segments_does_not_copy_body(self):
+        body = b"Hello world!"
+        segments = self.codec.encode_segments(SEND, [('foo', 'bar')], body)
+        self.assertIs(segments[1], body)
+        self.assertEqual(b''.join(segments),
+            self.codec.encode(SEND, [('foo', 'bar')], body))
+
+    def test_encode_segments_without_body(self):
+        segments = self.codec.encode_segments(SEND, [('foo', 'bar')])
+        self.assertEqual(segments, [b'SEND\nfoo:bar\n\n' + NULL.encode()])
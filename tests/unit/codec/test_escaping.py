@@ -35,6 +35,15 @@ class EscapingTestCase(unittest.TestCase):
         value = self.escape(self.raw + chr(92))
         self.assertEqual(value, self.raw + ESC + ESC)
 
+    def test_escape_multiple(self):
+        value = self.escape(chr(92) + 'n' + chr(10))
+        self.assertEqual(value, ESC + ESC + 'n' + ESC + chr(110))
+
+    def test_unescape_is_inverse(self):
+        raw = chr(92) + 'n' + chr(10) + chr(13) + chr(58)
+        value = Codec().unescape(SEND, self.escape(raw))
+        self.assertEqual(value, raw)
+
     def test_escape_line_feed_connect(self):
         value = self.escape_base(CONNECT, self.raw + chr(10))
         self.assertEqual(value, self.raw + chr(10))
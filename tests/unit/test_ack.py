@@ -0,0 +1,149 @@
+import time
+import unittest
+
+from stomp.const import ACK
+from stomp.const import ACK_CLIENT
+from stomp.const import ACK_INDIVIDUAL
+from stomp.const import HDR_ID
+from stomp.const import NACK
+from stomp.exc import FrameNotConfirmed
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.transport import Transport
+
+
+class BatchAcknowledgementTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.transport = Transport(get_broker_settings(self.broker))
+        self.transport.start()
+
+    def tearDown(self):
+        self.transport.stop()
+        self.broker.stop()
+
+    def receive(self, sub, count):
+        for i in range(count):
+            self.transport.send('/queue/foo', 'text/plain', str(i))
+        messages = []
+        def consume():
+            messages.extend(sub.messages)
+            return len(messages) >= count
+        wait_until(consume)
+        self.assertEqual(len(messages), count)
+        return messages
+
+    def test_individual_acks_are_sent_in_batches(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_INDIVIDUAL,
+            ack_batch=10, ack_interval=10000)
+        for msg in self.receive(sub, 25):
+            msg.accept()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(ACK)) == 20))
+        acks = self.broker.received(ACK)
+        self.assertEqual(len([f for f in acks if f.expects_receipt()]), 2)
+        self.assertEqual(sub.acknowledger.pending, 5)
+
+    def test_pending_acks_are_sent_after_interval(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_INDIVIDUAL,
+            ack_batch=10, ack_interval=10)
+        for msg in self.receive(sub, 5):
+            msg.accept()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(ACK)) == 5))
+
+    def test_client_mode_acks_last_message(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_CLIENT,
+            ack_batch=10, ack_interval=10000)
+        messages = self.receive(sub, 10)
+        for msg in messages:
+            msg.accept()
+        self.assertTrue(wait_until(lambda: self.broker.received(ACK)))
+        acks = self.broker.received(ACK)
+        self.assertEqual(len(acks), 1)
+        self.assertEqual(acks[0].headers[HDR_ID], messages[-1].headers['ack'])
+
+    def acked(self):
+        return [f.headers[HDR_ID] for f in self.broker.received(ACK)]
+
+    def test_client_mode_acks_contiguous_accepted_messages(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_CLIENT,
+            ack_batch=10, ack_interval=10000)
+        messages = self.receive(sub, 3)
+        ids = [m.headers['ack'] for m in messages]
+        messages[2].accept()
+        self.assertEqual(sub.acknowledger.pending, 0)
+        messages[0].accept()
+        self.assertEqual(sub.acknowledger.pending, 1)
+        sub.acknowledger.flush()
+        self.assertTrue(wait_until(lambda: self.acked() == ids[:1]))
+
+        messages[1].accept()
+        self.assertEqual(sub.acknowledger.pending, 2)
+        sub.acknowledger.flush()
+        self.assertTrue(wait_until(lambda: self.acked() == [ids[0], ids[2]]))
+
+    def test_client_mode_skips_rejected_messages(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_CLIENT,
+            ack_batch=10, ack_interval=10000)
+        messages = self.receive(sub, 3)
+        ids = [m.headers['ack'] for m in messages]
+        messages[2].accept()
+        messages[1].reject()
+        messages[0].accept()
+        sub.acknowledger.flush()
+        self.assertTrue(wait_until(lambda: self.acked() == [ids[2]]))
+        self.assertEqual([f.headers[HDR_ID] for f in self.broker.received(NACK)],
+            [ids[1]])
+
+    def test_client_mode_nack_precedes_later_acks(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_CLIENT,
+            ack_batch=10, ack_interval=10000)
+        messages = self.receive(sub, 2)
+        ids = [m.headers['ack'] for m in messages]
+        messages[1].accept()
+        messages[0].reject()
+        sub.acknowledger.flush()
+        self.assertTrue(wait_until(lambda: self.acked() == [ids[1]]))
+        self.assertEqual([(f.command, f.headers[HDR_ID])
+            for f in self.broker.received() if f.command in (ACK, NACK)],
+            [(NACK, ids[0]), (ACK, ids[1])])
+
+    def test_flush_does_not_wait_for_receipt(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_INDIVIDUAL,
+            ack_batch=10, ack_interval=10000)
+        messages = self.receive(sub, 2)
+        self.broker.receipts = False
+        self.transport.connection._receipt_timeout = 50
+        messages[0].accept()
+        t0 = time.time()
+        sub.acknowledger.flush()
+        self.assertLess(time.time() - t0, 0.05)
+        self.assertTrue(wait_until(
+            lambda: sub.acknowledger._error is not None))
+        self.assertRaises(FrameNotConfirmed, messages[1].accept)
+
+    def test_reject_sends_pending_acks_first(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_CLIENT,
+            ack_batch=10, ack_interval=10000)
+        messages = self.receive(sub, 2)
+        messages[0].accept()
+        messages[1].reject()
+        self.assertTrue(wait_until(lambda: self.broker.received(NACK)))
+        self.assertEqual([f.command for f in self.broker.received()
+            if f.command in (ACK, NACK)], [ACK, NACK])
+
+    def test_destroy_sends_pending_acks(self):
+        sub = self.transport.subscribe('/queue/foo', ack_mode=ACK_INDIVIDUAL,
+            ack_batch=10, ack_interval=10000)
+        for msg in self.receive(sub, 3):
+            msg.accept()
+        sub.destroy()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(ACK)) == 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
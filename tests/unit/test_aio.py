@@ -0,0 +1,137 @@
+import asyncio
+import unittest
+
+from stomp.aio import AsyncTransport
+from stomp.const import ACK
+from stomp.const import ACK_INDIVIDUAL
+from stomp.const import SEND
+from stomp.const import SUBSCRIBE
+from stomp.exc import ConnectionLost
+from stomp.exc import FrameNotConfirmed
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+
+
+class AsyncTestCase(unittest.TestCase):
+    broker_options = {}
+
+    def setUp(self):
+        self.broker = Broker(**self.broker_options).start()
+        self.settings = get_broker_settings(self.broker)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        self.broker.stop()
+
+    def run_transport(self, func):
+        async def main():
+            transport = AsyncTransport(self.settings)
+            await transport.start()
+            try:
+                return await asyncio.wait_for(func(transport), 5)
+            finally:
+                await transport.stop()
+        return self.loop.run_until_complete(main())
+
+
+class AsyncTransportTestCase(AsyncTestCase):
+
+    def test_start(self):
+        async def func(transport):
+            return transport.session.version
+        self.assertEqual(self.run_transport(func), '1.2')
+
+    def test_send_with_receipt(self):
+        async def func(transport):
+            await transport.send('/queue/foo', 'text/plain', "Hello world!",
+                receipt=True)
+        self.run_transport(func)
+        self.assertEqual(len(self.broker.received(SEND)), 1)
+
+    def test_consume_with_async_for(self):
+        async def func(transport):
+            sub = await transport.subscribe('/queue/foo')
+            for i in range(3):
+                await transport.send('/queue/foo', 'text/plain', str(i))
+            bodies = []
+            async for msg in sub:
+                bodies.append(msg.body)
+                if len(bodies) == 3:
+                    break
+            return bodies
+        self.assertEqual(self.run_transport(func), [b'0', b'1', b'2'])
+
+    def test_accept_is_awaitable(self):
+        async def func(transport):
+            sub = await transport.subscribe('/queue/foo',
+                ack_mode=ACK_INDIVIDUAL)
+            await transport.send('/queue/foo', 'text/plain', "Hello world!")
+            msg = await sub.get()
+            await msg.accept()
+        self.run_transport(func)
+        self.assertEqual(len(self.broker.received(ACK)), 1)
+
+    def test_prepared_send(self):
+        async def func(transport):
+            prepared = transport.prepare_send('/queue/foo', 'text/plain')
+            await asyncio.gather(*[prepared.send(b'x', receipt=True)
+                for _ in range(100)])
+        self.run_transport(func)
+        self.assertEqual(len(self.broker.received(SEND)), 100)
+
+    def test_send_many(self):
+        async def func(transport):
+            await transport.send_many([('/queue/foo', 'text/plain', str(i))
+                for i in range(3)], receipt=True)
+        self.run_transport(func)
+        self.assertEqual([f.body for f in self.broker.received(SEND)],
+            [b'0', b'1', b'2'])
+
+    def test_producer_is_not_supported(self):
+        async def func(transport):
+            with self.assertRaises(NotImplementedError):
+                transport.producer()
+        self.run_transport(func)
+
+    def test_iteration_ends_when_connection_is_lost(self):
+        async def func(transport):
+            sub = await transport.subscribe('/queue/foo')
+            self.broker.drop_clients()
+            async for msg in sub:
+                pass
+            return transport.connection.error
+        self.assertIsInstance(self.run_transport(func), ConnectionLost)
+
+    def test_threaded_options_are_rejected(self):
+        async def func(transport):
+            for option in ('handler', 'ack_batch'):
+                with self.assertRaises(TypeError):
+                    await transport.subscribe('/queue/foo',
+                        **{option: lambda msg: None})
+            return transport.session.subscriptions.subscriptions
+        self.assertEqual(self.run_transport(func), {})
+        self.assertEqual(len(self.broker.received(SUBSCRIBE)), 0)
+
+    def test_dedup_window(self):
+        async def func(transport):
+            sub = await transport.subscribe('/queue/foo', dedup_window=10,
+                dedup_max_age=60000)
+            return sub.seen.size, sub.seen.max_age
+        self.assertEqual(self.run_transport(func), (10, 60000))
+
+
+class AsyncReceiptTimeoutTestCase(AsyncTestCase):
+    broker_options = {'receipts': False}
+
+    def test_receipt_timeout(self):
+        async def func(transport):
+            transport.connection._receipt_timeout = 10
+            with self.assertRaises(FrameNotConfirmed):
+                await transport.send('/queue/foo', 'text/plain', "Hello",
+                    receipt=True)
+        self.run_transport(func)
+
+
+if __name__ == '__main__':
+    unittest.main()
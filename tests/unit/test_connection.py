@@ -0,0 +1,226 @@
+import collections
+import threading
+import time
+import unittest
+
+from stomp.const import ERROR
+from stomp.const import HDR_DESTINATION
+from stomp.const import HDR_ID
+from stomp.const import HDR_MESSAGE_ID
+from stomp.const import HDR_SUBSCRIPTION
+from stomp.const import MESSAGE
+from stomp.const import SEND
+from stomp.const import SUBSCRIBE
+from stomp.exc import ConnectionLost
+from stomp.exc import FrameNotConfirmed
+from stomp.exc import StompException
+from stomp.frames import SendFrame
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.connection import Connection
+from stomp.transport.transport import Transport
+
+
+class BacklogBroker(Broker):
+    """A :class:`Broker` that delivers a backlog of messages as soon as
+    a subscription is created, before confirming the ``SUBSCRIBE``
+    frame.
+    """
+    backlog = 5
+
+    def _handle(self, client, frame):
+        if frame.command == SUBSCRIBE:
+            for n in range(self.backlog):
+                self.send(client, MESSAGE, [
+                    (HDR_DESTINATION, frame.headers[HDR_DESTINATION]),
+                    (HDR_SUBSCRIPTION, frame.headers[HDR_ID]),
+                    (HDR_MESSAGE_ID, 'backlog-{0}'.format(n))
+                ], str(n))
+        return Broker._handle(self, client, frame)
+
+
+class RejectingBroker(Broker):
+    """A :class:`Broker` that rejects all subscriptions."""
+
+    def _handle(self, client, frame):
+        if frame.command == SUBSCRIBE:
+            self.send(client, ERROR, [('message', 'Access refused')])
+            return
+        return Broker._handle(self, client, frame)
+
+
+class ConnectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.settings = get_broker_settings(self.broker)
+        self.connection = Connection(self.settings)
+
+    def tearDown(self):
+        self.connection.close()
+        self.broker.stop()
+
+    def test_connect(self):
+        session = self.connection.connect()
+        self.assertEqual(session.version, '1.2')
+
+    def test_send_with_receipt(self):
+        self.connection.connect()
+        frame = SendFrame([('destination', '/queue/foo')], "Hello world!",
+            with_receipt=True)
+        self.connection.send_frame(frame)
+        self.assertEqual(len(self.broker.received(SEND)), 1)
+
+    def test_message_is_delivered(self):
+        transport = Transport(self.settings)
+        transport.connection = self.connection
+        transport.start()
+        sub = transport.subscribe('/queue/foo')
+        transport.send('/queue/foo', 'text/plain', "Hello world!",
+            receipt=True)
+        self.assertTrue(wait_until(lambda: sub.message_count == 1))
+        self.assertEqual(list(sub.messages)[0].body, b"Hello world!")
+
+    def test_concurrent_producers(self):
+        self.connection.connect()
+
+        def publish(n):
+            for i in range(200):
+                frame = SendFrame([('destination', '/queue/foo')],
+                    '{0}:{1}'.format(n, i))
+                self.connection.send_frame(frame)
+
+        threads = [threading.Thread(target=publish, args=[n]) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.connection.flush()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(SEND)) == 1600))
+
+        # Frames of the same producer are sent in order.
+        received = collections.defaultdict(list)
+        for frame in self.broker.received(SEND):
+            n, i = frame.body.decode().split(':')
+            received[n].append(int(i))
+        self.assertEqual(list(received.values()), [list(range(200))] * 8)
+
+    def test_claim_is_exclusive(self):
+        self.connection.connect()
+        frame = SendFrame([('destination', '/queue/foo')], "bar")
+        with self.connection.claim():
+            t = threading.Thread(target=self.connection.send_frame,
+                args=[frame])
+            t.start()
+            t.join(0.05)
+            self.assertTrue(t.is_alive())
+            self.connection.send_frame(
+                SendFrame([('destination', '/queue/foo')], "foo"))
+        t.join()
+        self.connection.flush()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(SEND)) == 2))
+        self.assertEqual([f.body for f in self.broker.received(SEND)],
+            [b"foo", b"bar"])
+
+    def test_frames_are_routed_by_command(self):
+        session = self.connection.connect()
+        session.subscribe('/queue/foo')
+        received = []
+        self.connection.register_handler(MESSAGE, received.append)
+        self.connection.send_frame(
+            SendFrame([('destination', '/queue/foo')], "bar"))
+        self.assertTrue(wait_until(lambda: received))
+        self.assertEqual(received[0].body, b"bar")
+        self.assertTrue(self.connection.frames.empty())
+
+    def test_observers_may_discard_frames(self):
+        session = self.connection.connect()
+        sub = session.subscribe('/queue/foo')
+        events = []
+
+        class Observer(object):
+
+            def notify(self, event, frame):
+                events.append((event, frame.command))
+                if event == Connection.EVNT_FRAME_RECV:
+                    raise Connection.DiscardFrame
+
+        self.connection.register_observer(Observer())
+        self.connection.send_frame(
+            SendFrame([('destination', '/queue/foo')], "bar"))
+        self.assertTrue(wait_until(
+            lambda: (Connection.EVNT_FRAME_RECV, MESSAGE) in events))
+        self.assertIn((Connection.EVNT_FRAME_SENT, SEND), events)
+        self.assertEqual(sub.message_count, 0)
+
+    def test_idle_connection_does_not_poll(self):
+        self.connection.connect()
+        calls = []
+        self.connection.update = lambda: calls.append(None)
+        time.sleep(0.2)
+        self.assertEqual(calls, [])
+
+    def test_close_stops_thread(self):
+        self.connection.connect()
+        self.connection.close()
+        self.connection.thread.join(1)
+        self.assertFalse(self.connection.thread.is_alive())
+
+    def test_connection_closed_by_server(self):
+        self.connection.connect()
+        self.broker.drop_clients()
+        self.connection.thread.join(1)
+        self.assertFalse(self.connection.thread.is_alive())
+        self.assertIsInstance(self.connection._error, ConnectionLost)
+
+
+class SubscribeTestCase(unittest.TestCase):
+
+    def start(self, broker_class):
+        self.broker = broker_class().start()
+        self.addCleanup(self.broker.stop)
+        self.transport = Transport(get_broker_settings(self.broker))
+        self.transport.start()
+        self.addCleanup(self.transport.stop)
+
+    def test_messages_before_receipt_are_not_lost(self):
+        self.start(BacklogBroker)
+
+        # Delay registering the subscription, so that the backlog would
+        # arrive before it if it were registered after subscribing.
+        subscriptions = self.transport.session.subscriptions
+        add = subscriptions.add
+        def delayed_add(*args, **kwargs):
+            time.sleep(0.05)
+            return add(*args, **kwargs)
+        subscriptions.add = delayed_add
+
+        sub = self.transport.subscribe('/queue/foo')
+        wait_until(lambda: sub.message_count >= 5)
+        self.assertEqual([m.body for m in sub.messages],
+            [str(n).encode() for n in range(5)])
+
+    def test_rejected_subscription_is_removed(self):
+        self.start(RejectingBroker)
+        self.assertRaises(StompException, self.transport.subscribe,
+            '/queue/foo')
+        self.assertEqual(list(self.transport.session.subscriptions), [])
+
+    def test_unconfirmed_subscription_is_not_sent_again(self):
+        self.start(Broker)
+        self.broker.receipts = False
+        self.transport.connection._receipt_timeout = 50
+        self.transport.connection._max_retries = 3
+        self.assertRaises(FrameNotConfirmed, self.transport.subscribe,
+            '/queue/foo')
+        self.transport.connection.flush()
+        self.assertTrue(wait_until(lambda: self.broker.received(SUBSCRIBE)))
+        self.assertEqual(len(self.broker.received(SUBSCRIBE)), 1)
+        self.assertEqual(list(self.transport.session.subscriptions), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
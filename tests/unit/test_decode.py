@@ -78,6 +78,17 @@ class DecodingTestCase(unittest.TestCase):
         buf = io.BytesIO(msg)
         self.codec.decode(buf)
 
+    def test_decode_leaves_buffer_at_next_frame(self):
+        msg = re.sub('content-length:.*\n', '', self.msg.decode()).encode()
+        buf = io.BytesIO(LF.encode() + msg + self.msg + LF.encode())
+        frames = list(self.codec.consume_buffer(buf))
+        self.assertEqual([f.body for f in frames], [b"Hello world!"] * 2)
+
+    def test_decode_unterminated_body_raises(self):
+        msg = re.sub('content-length:.*\n', '', self.msg.decode()).encode()
+        buf = io.BytesIO(msg[:-1])
+        self.assertRaises(MalformedFrame, self.codec.decode, buf)
+
     def test_non_integer_content_length_raises(self):
         msg = self.msg.decode()\
             .replace('content-length:','content-length:aaaa')
@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from stomp.transport.dedup import DuplicateIndex
+
+
+class DuplicateIndexTestCase(unittest.TestCase):
+
+    def test_duplicates_are_rejected(self):
+        index = DuplicateIndex(10)
+        self.assertTrue(index.add('1'))
+        self.assertTrue(index.add('2'))
+        self.assertFalse(index.add('1'))
+        self.assertEqual(index.duplicates, 1)
+        self.assertEqual(len(index), 2)
+
+    def test_oldest_ids_are_evicted(self):
+        index = DuplicateIndex(3)
+        for mid in '1234':
+            index.add(mid)
+        self.assertNotIn('1', index)
+        self.assertEqual(len(index), 3)
+        self.assertTrue(index.add('1'))
+        self.assertNotIn('2', index)
+        self.assertFalse(index.add('4'))
+
+    def test_expired_ids_are_evicted(self):
+        index = DuplicateIndex(10, max_age=10)
+        index.add('1')
+        time.sleep(0.02)
+        index.add('2')
+        self.assertNotIn('1', index)
+        self.assertIn('2', index)
+        self.assertTrue(index.add('1'))
+
+    def test_max_age_uses_clock(self):
+        now = [0.0]
+        index = DuplicateIndex(10, max_age=1000, clock=lambda: now[0])
+        index.add('1')
+        now[0] = 0.5
+        self.assertFalse(index.add('1'))
+        now[0] = 1.5
+        self.assertTrue(index.add('1'))
+
+    def test_ids_are_stored_as_digests(self):
+        index = DuplicateIndex(10)
+        index.add('ID:broker-12345-1234567890-1:1:1:1:1')
+        self.assertEqual(index._order.itemsize, 8)
+        self.assertTrue(all(isinstance(k, int) for k in index.ids))
+
+    def test_zero_size_disables_detection(self):
+        index = DuplicateIndex(0)
+        self.assertTrue(index.add('1'))
+        self.assertTrue(index.add('1'))
+        self.assertEqual(index.duplicates, 0)
+
+    def test_large_window(self):
+        index = DuplicateIndex(100000)
+        for i in range(200000):
+            index.add(i)
+        self.assertEqual(len(index), 100000)
+        self.assertNotIn(99999, index)
+        self.assertFalse(index.add(100000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import threading
+import time
+import unittest
+
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.dispatcher import Dispatcher
+from stomp.transport.transport import Transport
+
+
+class DummyMessage(object):
+
+    def __init__(self, key, n):
+        self.headers = {'destination': key}
+        self.n = n
+
+
+class DispatcherTestCase(unittest.TestCase):
+
+    def test_messages_with_same_key_are_ordered(self):
+        handled = {}
+        lock = threading.Lock()
+
+        def handler(msg):
+            time.sleep(0.0001 * (msg.n % 3))
+            with lock:
+                handled.setdefault(msg.headers['destination'], []).append(msg.n)
+
+        dispatcher = Dispatcher(handler, workers=4)
+        for n in range(100):
+            for key in ('a', 'b', 'c', 'd', 'e'):
+                dispatcher.put(DummyMessage(key, n))
+        dispatcher.close()
+        self.assertEqual(handled, dict((k, list(range(100))) for k in 'abcde'))
+
+    def test_different_keys_run_in_parallel(self):
+        barrier = threading.Barrier(2, timeout=2)
+        dispatcher = Dispatcher(lambda msg: barrier.wait(), workers=2,
+            order_key=lambda msg: msg.n)
+        dispatcher.put(DummyMessage('a', 0))
+        dispatcher.put(DummyMessage('a', 1))
+        dispatcher.close()
+        self.assertFalse(barrier.broken)
+        self.assertEqual(barrier.n_waiting, 0)
+
+    def test_full_queue_pauses(self):
+        started = threading.Event()
+        release = threading.Event()
+        events = []
+        def handler(msg):
+            started.set()
+            release.wait()
+        dispatcher = Dispatcher(handler, workers=1, maxsize=4)
+        dispatcher.bind(lambda: events.append('pause'),
+            lambda: events.append('resume'))
+        dispatcher.put(DummyMessage('a', 0))
+        self.assertTrue(started.wait(1))
+        for n in range(1, 4):
+            dispatcher.put(DummyMessage('a', n))
+        self.assertEqual(events, [])
+
+        dispatcher.put(DummyMessage('a', 4))
+        dispatcher.put(DummyMessage('a', 5))
+        self.assertEqual(events, ['pause'])
+        release.set()
+        dispatcher.join()
+        self.assertEqual(events, ['pause', 'resume'])
+        dispatcher.close()
+
+    def test_handler_exception_does_not_stop_worker(self):
+        handled = []
+
+        def handler(msg):
+            if msg.n == 0:
+                raise ValueError
+            handled.append(msg.n)
+
+        dispatcher = Dispatcher(handler, workers=1)
+        dispatcher.put(DummyMessage('a', 0))
+        dispatcher.put(DummyMessage('a', 1))
+        dispatcher.close()
+        self.assertEqual(handled, [1])
+
+
+class SubscribeWithHandlerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.transport = Transport(get_broker_settings(self.broker))
+        self.transport.start()
+
+    def tearDown(self):
+        self.transport.stop()
+        self.broker.stop()
+
+    def test_handler_receives_messages(self):
+        received = []
+        done = threading.Event()
+
+        def handler(msg):
+            received.append(msg.body)
+            if len(received) == 10:
+                done.set()
+
+        sub = self.transport.subscribe('/queue/foo', handler=handler,
+            workers=2)
+        for i in range(10):
+            self.transport.send('/queue/foo', 'text/plain', str(i))
+        self.assertTrue(done.wait(2))
+        self.assertEqual(received, [str(i).encode() for i in range(10)])
+        self.assertEqual(list(sub.messages), [])
+        sub.destroy()
+        self.assertFalse(any(t.is_alive() for t in sub.dispatcher.threads))
+
+    def test_acknowledging_handlers_are_throttled(self):
+        # The ACK frames of the handler are not waited for, so reading
+        # stays paused while the queue of the only worker is full.
+        received = []
+        depths = []
+        done = threading.Event()
+
+        def handler(msg):
+            depths.append(sub.dispatcher.queues[0].qsize())
+            msg.accept()
+            received.append(msg.body)
+            if len(received) == 500:
+                done.set()
+
+        sub = self.transport.subscribe('/queue/foo', handler=handler,
+            ack_mode='client-individual', workers=1, max_pending=10)
+        for i in range(500):
+            self.transport.send('/queue/foo', 'text/plain', 'x' * 10000)
+        self.assertTrue(done.wait(10))
+        self.assertLess(max(depths), 40)
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received('ACK')) == 500))
+        self.assertFalse(self.transport.connection.paused)
+        sub.destroy()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+from stomp.const import CONNECT
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.connection import Connection
+from stomp.transport.endpoints import EndpointSet
+from stomp.transport.endpoints import interleave
+from stomp.transport.endpoints import parse_endpoint
+from stomp.transport.endpoints import race
+from stomp.transport.transport import Transport
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SlowBroker(Broker):
+    """A :class:`Broker` that delays the ``CONNECTED`` frame."""
+    delay = 0.2
+
+    def _handle(self, client, frame):
+        if frame.command == CONNECT:
+            time.sleep(self.delay)
+        return Broker._handle(self, client, frame)
+
+
+def unused_address():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    address = sock.getsockname()
+    sock.close()
+    return address
+
+
+class ParseEndpointTestCase(unittest.TestCase):
+
+    def test_tuple(self):
+        self.assertEqual(parse_endpoint(('localhost', 61613)),
+            ('localhost', 61613))
+
+    def test_string(self):
+        self.assertEqual(parse_endpoint('localhost:61613'),
+            ('localhost', 61613))
+
+    def test_ipv6(self):
+        self.assertEqual(parse_endpoint('[::1]:61613'), ('::1', 61613))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_endpoint, 'localhost')
+
+
+class InterleaveTestCase(unittest.TestCase):
+
+    def test_families_alternate(self):
+        v4, v6 = socket.AF_INET, socket.AF_INET6
+        addresses = [(v6, 1), (v6, 2), (v6, 3), (v4, 4), (v4, 5)]
+        self.assertEqual([a[1] for a in interleave(addresses)], [1, 4, 2, 5, 3])
+
+
+class EndpointSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.endpoints = EndpointSet([('a', 1), ('b', 2), ('c', 3)],
+            quarantine=1000, clock=self.clock)
+
+    def test_configuration_order_by_default(self):
+        self.assertEqual(self.endpoints.ranked(), [('a', 1), ('b', 2), ('c', 3)])
+
+    def test_fastest_endpoint_first(self):
+        self.endpoints.succeeded(('c', 3), 0.01)
+        self.endpoints.succeeded(('b', 2), 0.05)
+        self.assertEqual(self.endpoints.ranked(), [('c', 3), ('b', 2), ('a', 1)])
+
+    def test_latency_is_smoothed(self):
+        self.endpoints.succeeded(('a', 1), 0.1)
+        self.endpoints.succeeded(('a', 1), 0.2)
+        self.assertAlmostEqual(self.endpoints.latencies[('a', 1)], 0.13)
+
+    def test_failed_endpoint_is_quarantined(self):
+        self.endpoints.succeeded(('a', 1), 0.01)
+        self.endpoints.failed(('a', 1))
+        self.assertEqual(self.endpoints.ranked()[-1], ('a', 1))
+        self.clock.now = 1.0
+        self.assertEqual(self.endpoints.ranked()[0], ('a', 1))
+
+
+class RaceTestCase(unittest.TestCase):
+
+    def test_first_success_wins(self):
+        def slow():
+            time.sleep(0.2)
+            return 'slow'
+        result = race([slow, lambda: 'fast'], 0.01)
+        self.assertEqual(result, 'fast')
+
+    def test_attempts_are_staggered(self):
+        started = []
+        def attempt(value):
+            def func():
+                started.append(value)
+                return value
+            return func
+        self.assertEqual(race([attempt(1), attempt(2)], 0.5), 1)
+        self.assertEqual(started, [1])
+
+    def test_failure_starts_next_attempt(self):
+        def fail():
+            raise ConnectionRefusedError
+        t0 = time.monotonic()
+        self.assertEqual(race([fail, lambda: 'ok'], 5), 'ok')
+        self.assertLess(time.monotonic() - t0, 1)
+
+    def test_last_error_is_raised(self):
+        def fail():
+            raise ConnectionRefusedError
+        self.assertRaises(ConnectionRefusedError, race, [fail, fail], 0.01)
+
+    def test_late_results_are_discarded(self):
+        discarded = []
+        event = threading.Event()
+        def late():
+            event.wait()
+            return 'late'
+        self.assertEqual(race([late, lambda: 'first'], 0,
+            discard=lambda r: (discarded.append(r))), 'first')
+        event.set()
+        wait_until(lambda: discarded, 1)
+        self.assertEqual(discarded, ['late'])
+
+    def test_timeout(self):
+        event = threading.Event()
+        self.assertRaises(socket.timeout, race,
+            [event.wait, event.wait], 0, timeout=0.05)
+        event.set()
+
+
+class FailoverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.brokers = []
+        self.transport = None
+
+    def tearDown(self):
+        if self.transport is not None:
+            self.transport.stop()
+        for broker in self.brokers:
+            broker.stop()
+
+    def start_broker(self, broker_class=Broker):
+        broker = broker_class().start()
+        self.brokers.append(broker)
+        return broker
+
+    def connect(self, endpoints, **params):
+        settings = get_broker_settings(self.brokers[0], endpoints=endpoints,
+            **params)
+        self.transport = Transport(settings)
+        self.transport.start()
+        return self.transport.connection
+
+    def test_unreachable_endpoint_is_skipped(self):
+        broker = self.start_broker()
+        connection = self.connect([unused_address(), broker.address])
+        self.assertEqual(connection.endpoint, broker.address)
+        self.transport.send('/queue/foo', 'text/plain', 'foo', receipt=True)
+
+    def test_fastest_handshake_wins(self):
+        slow = self.start_broker(SlowBroker)
+        fast = self.start_broker()
+        connection = self.connect([slow.address, fast.address],
+            endpoint_delay=10)
+        self.assertEqual(connection.endpoint, fast.address)
+        self.assertIn(fast.address, connection.endpoints.latencies)
+
+    def test_failover_on_reconnect(self):
+        first = self.start_broker()
+        second = self.start_broker()
+        connection = self.connect([first.address, second.address],
+            reconnect=True, reconnect_delay=10)
+        self.assertEqual(connection.endpoint, first.address)
+
+        first.stop()
+        wait_until(lambda: connection.reconnects)
+        self.assertEqual(connection.endpoint, second.address)
+        self.transport.send('/queue/foo', 'text/plain', 'foo', receipt=True)
+
+
+class DualStackTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.connection = None
+
+    def tearDown(self):
+        if self.connection is not None:
+            self.connection.close()
+        self.broker.stop()
+
+    def connect(self, addresses, hanging=(), **params):
+        # Connect to the broker with getaddrinfo() returning `addresses`,
+        # and connection attempts to the families in `hanging` never
+        # completing.
+        settings = get_broker_settings(self.broker, **params)
+        self.connection = Connection(settings)
+        released = threading.Event()
+        self.addCleanup(released.set)
+        connect_address = self.connection._connect_address
+        def hanging_connect_address(address, timeout):
+            if address[0] in hanging:
+                released.wait(timeout)
+                raise socket.timeout
+            return connect_address(address, timeout)
+        self.connection._connect_address = hanging_connect_address
+        with mock.patch('socket.getaddrinfo', return_value=addresses):
+            return self.connection.connect()
+
+    def address(self, family, sockaddr):
+        return (family, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', sockaddr)
+
+    @unittest.skipUnless(socket.has_ipv6, "IPv6 is not available")
+    def test_ipv6(self):
+        self.broker.stop()
+        try:
+            self.broker = Broker(socket.AF_INET6, ('::1', 0)).start()
+        except EnvironmentError:
+            self.skipTest("IPv6 loopback is not available")
+        settings = get_broker_settings(self.broker, host='::1')
+        self.connection = Connection(settings)
+        self.connection.connect()
+        self.assertEqual(self.connection.socket.family, socket.AF_INET6)
+
+    def test_broken_ipv6_route(self):
+        started = time.monotonic()
+        self.connect([
+            self.address(socket.AF_INET6, ('::1', self.broker.port, 0, 0)),
+            self.address(socket.AF_INET, self.broker.address)
+        ], hanging=[socket.AF_INET6], address_delay=50)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.connection.socket.family, socket.AF_INET)
+        self.assertFalse(self.connection.socket.getblocking())
+
+    def test_connect_timeout(self):
+        started = time.monotonic()
+        self.assertRaises(socket.timeout, self.connect, [
+            self.address(socket.AF_INET6, ('::1', self.broker.port, 0, 0)),
+            self.address(socket.AF_INET, self.broker.address)
+        ], hanging=[socket.AF_INET6, socket.AF_INET], connect_timeout=100,
+            address_delay=10)
+        self.assertLess(time.monotonic() - started, 1)
+        self.connection = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import time
+import unittest
+
+from stomp.const import SUBSCRIBE
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.transport import Transport
+
+
+class FlowControlTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        settings = get_broker_settings(self.broker)
+        self.consumer = Transport(settings)
+        self.consumer.start()
+        self.publisher = Transport(settings)
+        self.publisher.start()
+
+    def tearDown(self):
+        self.publisher.stop()
+        self.consumer.stop()
+        self.broker.stop()
+
+    def subscribe(self, prefetch, **kwargs):
+        sub = self.consumer.subscribe('/queue/foo', prefetch=prefetch,
+            **kwargs)
+        self.assertTrue(wait_until(lambda: self.broker.received(SUBSCRIBE)))
+        return sub
+
+    def publish(self, count):
+        for i in range(count):
+            self.publisher.send('/queue/foo', 'text/plain', 'x' * 1000)
+        self.publisher.send('/queue/bar', 'text/plain', '', receipt=True)
+
+    def test_prefetch_is_sent_to_server(self):
+        self.subscribe(10)
+        headers = self.broker.received(SUBSCRIBE)[0].headers
+        self.assertEqual(headers['activemq.prefetchSize'], '10')
+        self.assertEqual(headers['prefetch-count'], '10')
+
+    def test_reading_is_paused_above_prefetch(self):
+        connection = self.consumer.connection
+        sub = self.subscribe(10)
+        self.publish(100)
+        self.assertTrue(wait_until(lambda: connection.paused))
+        time.sleep(0.05)
+        self.assertGreaterEqual(sub.depth, 10)
+        self.assertLess(sub.depth, 20)
+
+        received = []
+        def consume():
+            received.extend(sub.messages)
+            return len(received) >= 100
+        wait_until(consume)
+        self.assertEqual(len(received), 100)
+        self.assertGreater(connection.stats['paused_time'], 0)
+
+    def test_acknowledging_does_not_resume_reading(self):
+        # A consumer acknowledges a message while its subscription is
+        # above the prefetch limit; the server is not read until the
+        # consumer caught up, so the receipt is pending until then. The
+        # test broker does not handle frames while the consumer does not
+        # read, so nothing is published with a receipt.
+        connection = self.consumer.connection
+        sub = self.subscribe(10, low_water=0, ack_mode='client-individual')
+        for i in range(500):
+            self.publisher.send('/queue/foo', 'text/plain', 'x' * 10000)
+        self.publisher.connection.flush()
+        self.assertTrue(wait_until(lambda: connection.paused))
+        msg = next(sub.messages)
+        future = msg.accept()
+        time.sleep(0.1)
+        self.assertTrue(connection.paused)
+        self.assertLess(sub.depth, 40)
+        self.assertFalse(future.done())
+
+        received = [msg]
+        def consume():
+            received.extend(sub.messages)
+            return len(received) >= 500
+        self.assertTrue(wait_until(consume))
+        self.assertTrue(future.result(2))
+
+    def test_destroy_resumes_reading(self):
+        connection = self.consumer.connection
+        sub = self.subscribe(1)
+        self.publish(3)
+        self.assertTrue(wait_until(lambda: connection.paused))
+        sub.destroy()
+        self.assertFalse(connection.paused)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import pickle
+import unittest
+
+from stomp.const import MESSAGE
+from stomp.frames import Frame
+
+
+class FrameTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = Frame(''.join(['MESS', 'AGE']), [('foo', '1')], b'bar')
+
+    def test_command_is_interned(self):
+        self.assertIs(self.frame.command, MESSAGE)
+
+    def test_headers_are_cached(self):
+        self.assertIs(self.frame.headers, self.frame.headers)
+
+    def test_headers_are_read_only(self):
+        with self.assertRaises(TypeError):
+            self.frame.headers['foo'] = '2'
+
+    def test_set_header_updates_headers(self):
+        self.assertFalse(self.frame.has_header('baz'))
+        self.frame.set_header('baz', '2')
+        self.assertEqual(self.frame.headers['baz'], '2')
+        self.assertEqual(list(self.frame)[1], [('foo', '1'), ('baz', '2')])
+
+    def test_frame_has_no_dict(self):
+        self.assertFalse(hasattr(self.frame, '__dict__'))
+
+    def test_frame_can_be_pickled(self):
+        self.frame.headers
+        frame = pickle.loads(pickle.dumps(self.frame))
+        self.assertEqual(frame.headers['foo'], '1')
+        self.assertEqual(frame.body, b'bar')
+
+
+if __name__ == '__main__':
+    unittest.main()
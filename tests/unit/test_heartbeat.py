@@ -0,0 +1,79 @@
+import time
+import unittest
+
+from stomp.conf import settings_factory
+from stomp.exc import ConnectionLost
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.transport.connection import Connection
+from stomp.transport.heartbeat import Heartbeat
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HeartbeatTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.heartbeat = Heartbeat(1000, 500, grace=2.0, clock=self.clock)
+
+    def test_negotiate(self):
+        settings = settings_factory(host=None, port=None, vhost=None,
+            username=None, password=None, send_hb=1000, recv_hb=500)
+        heartbeat = Heartbeat.negotiate(settings, 2000, 100)
+        self.assertEqual(heartbeat.send_interval, 1.0)
+        self.assertEqual(heartbeat.recv_interval, 2.0)
+
+    def test_negotiate_disabled(self):
+        settings = settings_factory(host=None, port=None, vhost=None,
+            username=None, password=None, send_hb=1000, recv_hb=0)
+        heartbeat = Heartbeat.negotiate(settings, 2000, 0)
+        self.assertIsNone(heartbeat.timeout())
+
+    def test_send_deadline(self):
+        self.clock.now = 0.6
+        self.heartbeat.received()
+        self.assertAlmostEqual(self.heartbeat.send_timeout(), 0.4)
+        self.assertFalse(self.heartbeat.must_send())
+        self.clock.now = 1.0
+        self.assertTrue(self.heartbeat.must_send())
+        self.heartbeat.sent()
+        self.assertAlmostEqual(self.heartbeat.send_timeout(), 1.0)
+
+    def test_server_is_dead_after_grace_period(self):
+        self.assertAlmostEqual(self.heartbeat.timeout(), 1.0)
+        self.clock.now = 0.9
+        self.heartbeat.received()
+        self.clock.now = 1.8
+        self.assertFalse(self.heartbeat.is_dead())
+        self.clock.now = 1.9
+        self.assertTrue(self.heartbeat.is_dead())
+
+
+class ServerLivenessTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker(heartbeat=(50, 0)).start()
+        settings = get_broker_settings(self.broker, recv_hb=50)
+        self.connection = Connection(settings)
+
+    def tearDown(self):
+        self.connection.close()
+        self.broker.stop()
+
+    def test_silent_server_is_detected(self):
+        self.connection.connect()
+        self.connection.thread.join(1)
+        self.assertFalse(self.connection.thread.is_alive())
+        self.assertIsInstance(self.connection._error, ConnectionLost)
+
+
+if __name__ == '__main__':
+    unittest.main()
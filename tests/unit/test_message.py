@@ -1,5 +1,7 @@
 import unittest
 
+from stomp.conf import settings_factory
+from stomp.transport.connection import Connection
 from stomp.transport.message import Message
 from stomp.frames import Frame
 from stomp.const import MESSAGE
@@ -20,7 +22,27 @@ class MessageTestCase(unittest.TestCase):
             (HDR_CONTENT_LENGTH, 'baz')
         ]
         frame = Frame(MESSAGE, headers, "Hello world!")
-        self.assertRaises(StompException, Message.fromframe, None, None, frame)
+        msg = Message.fromframe(None, None, frame)
+        self.assertRaises(StompException, getattr, msg, 'content_length')
+
+    def test_attributes_are_derived_from_frame(self):
+        headers = [
+            (HDR_DESTINATION, '/queue/foo,/queue/bar'),
+            (HDR_MESSAGE_ID, 'foo'),
+            (HDR_SUBSCRIPTION, 'bar'),
+            (HDR_CONTENT_LENGTH, '12')
+        ]
+        body = b"Hello world!"
+        frame = Frame(MESSAGE, headers, body)
+        connection = Connection(settings_factory(host=None, port=None,
+            vhost=None, username=None, password=None))
+        msg = Message.fromframe(connection, None, frame)
+        self.assertEqual(msg.mid, 'foo')
+        self.assertIs(msg.body, body)
+        self.assertEqual(msg.content_length, 12)
+        self.assertIsNone(msg.content_type)
+        self.assertEqual(msg.destinations, ['/queue/foo', '/queue/bar'])
+        self.assertFalse(hasattr(msg, '__dict__'))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,95 @@
+import unittest
+
+from stomp.codec import Codec
+from stomp.const import MESSAGE
+from stomp.const import SEND
+from stomp.exc import InvalidCommandType
+from stomp.exc import MalformedFrame
+
+
+class FrameParserTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = Codec()
+        self.parser = self.codec.parser()
+        self.headers = [
+            ('destination', '/queue/test'),
+            ('message-id', 'foo'),
+            ('subscription', 'bar')
+        ]
+        self.msg = self.codec.encode(MESSAGE, self.headers, "Hello world!")
+
+    def test_complete_frame(self):
+        self.parser.feed(self.msg)
+        frames = list(self.parser)
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0].command, MESSAGE)
+        self.assertEqual(frames[0].body, b"Hello world!")
+        self.assertEqual(frames[0].headers['message-id'], 'foo')
+
+    def test_frame_split_across_reads(self):
+        for i in range(1, len(self.msg)):
+            parser = self.codec.parser()
+            parser.feed(self.msg[:i])
+            self.assertEqual(list(parser), [])
+            parser.feed(self.msg[i:])
+            frames = list(parser)
+            self.assertEqual(len(frames), 1, i)
+            self.assertEqual(frames[0].body, b"Hello world!")
+
+    def test_frame_split_without_content_length(self):
+        msg = self.codec.encode(SEND, [('destination', 'foo')])
+        msg = msg[:-1] + b"Hello world!\x00"
+        self.parser.feed(msg[:-5])
+        self.assertEqual(list(self.parser), [])
+        self.parser.feed(msg[-5:])
+        self.assertEqual([f.body for f in self.parser], [b"Hello world!"])
+
+    def test_back_to_back_frames_with_heartbeats(self):
+        self.parser.feed(b'\n' + self.msg + b'\r\n\n' + self.msg + b'\n')
+        self.assertEqual(len(list(self.parser)), 2)
+        self.assertEqual(len(self.parser), 0)
+
+    def test_body_containing_null_with_content_length(self):
+        msg = self.codec.encode(MESSAGE, self.headers, b"foo\x00bar")
+        self.parser.feed(msg)
+        self.assertEqual([f.body for f in self.parser], [b"foo\x00bar"])
+
+    def test_carriage_return_eol(self):
+        codec = Codec(eol='\r')
+        self.parser.feed(codec.encode(SEND, self.headers, "Hello world!"))
+        frame, = list(self.parser)
+        self.assertEqual(frame.headers['destination'], '/queue/test')
+        self.assertEqual(frame.body, b"Hello world!")
+
+    def test_buffer_grows_for_large_frames(self):
+        body = b'x' * (len(self.parser.buf) * 4)
+        msg = self.codec.encode(MESSAGE, self.headers, body)
+        for i in range(0, len(msg), 1000):
+            self.parser.feed(msg[i:i+1000])
+        self.assertEqual([f.body for f in self.parser], [body])
+
+    def test_recv_into(self):
+        chunks = [self.msg[:10], self.msg[10:]]
+
+        def recv_into(buf, n):
+            chunk = chunks.pop(0)
+            buf[:len(chunk)] = chunk
+            return len(chunk)
+
+        self.assertEqual(self.parser.recv_into(recv_into, 1024), 10)
+        self.assertEqual(list(self.parser), [])
+        self.parser.recv_into(recv_into, 1024)
+        self.assertEqual(len(list(self.parser)), 1)
+
+    def test_trailing_data_raises(self):
+        self.parser.feed(self.msg[:-1] + b'a')
+        self.assertRaises(MalformedFrame, list, self.parser)
+
+    def test_invalid_command_raises(self):
+        self.parser.feed(b'FOO\n\n\x00')
+        self.assertRaises(InvalidCommandType, list, self.parser)
+
+
+if __name__ == '__main__':
+    unittest.main()
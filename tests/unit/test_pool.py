@@ -0,0 +1,82 @@
+import unittest
+
+from stomp.const import SEND
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.pool import TransportPool
+
+
+class TransportPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.settings = get_broker_settings(self.broker)
+
+    def tearDown(self):
+        self.broker.stop()
+
+    def start_pool(self, **kwargs):
+        pool = TransportPool(self.settings, size=3, **kwargs)
+        pool.start()
+        self.addCleanup(pool.stop)
+        return pool
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, TransportPool, self.settings, size=0)
+        self.assertRaises(ValueError, TransportPool, self.settings,
+            strategy='random')
+
+    def test_select_by_destination_is_stable(self):
+        pool = TransportPool(self.settings, size=3)
+        self.assertIs(pool.select('/queue/foo'), pool.select('/queue/foo'))
+        selected = set(id(pool.select('/queue/{0}'.format(i)))
+            for i in range(100))
+        self.assertEqual(len(selected), 3)
+
+    def test_select_round_robin(self):
+        pool = TransportPool(self.settings, size=3, strategy='round-robin')
+        selected = [pool.select('/queue/foo') for _ in range(6)]
+        self.assertEqual(selected, pool.transports * 2)
+
+    def test_send_preserves_order_per_destination(self):
+        pool = self.start_pool()
+        for i in range(50):
+            for dest in ('/queue/a', '/queue/b', '/queue/c'):
+                pool.send(dest, 'text/plain', str(i))
+        for transport in pool.transports:
+            transport.connection.flush()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(SEND)) == 150))
+        for dest in ('/queue/a', '/queue/b', '/queue/c'):
+            bodies = [f.body for f in self.broker.received(SEND)
+                if f.headers['destination'] == dest]
+            self.assertEqual(bodies, [str(i).encode() for i in range(50)])
+
+    def test_send_many(self):
+        pool = self.start_pool(strategy='round-robin')
+        messages = [('/queue/foo', 'text/plain', str(i)) for i in range(30)]
+        pool.send_many(messages, receipt=True)
+        self.assertEqual(len(self.broker.received(SEND)), 30)
+
+    def test_subscriptions_are_spread(self):
+        pool = self.start_pool()
+        for i in range(3):
+            pool.subscribe('/queue/{0}'.format(i))
+        self.assertEqual([len(list(t.session.subscriptions))
+            for t in pool.transports], [1, 1, 1])
+
+    def test_stats(self):
+        pool = self.start_pool(strategy='round-robin')
+        for i in range(6):
+            pool.send('/queue/foo', 'text/plain', 'x', receipt=True)
+        stats = pool.stats()
+        self.assertEqual(stats['connections'], 3)
+        # CONNECT and six SEND frames.
+        self.assertEqual(stats['frames_sent'], 9)
+        self.assertEqual(stats['frames_received'], 9)
+        self.assertGreater(stats['bytes_sent'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
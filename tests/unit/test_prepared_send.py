@@ -0,0 +1,62 @@
+import socket
+import unittest
+
+from stomp.conf import settings_factory
+from stomp.const import SEND
+from stomp.transport.connection import Connection
+from stomp.transport.prepared import PreparedSend
+
+
+class PreparedSendTestCase(unittest.TestCase):
+
+    def setUp(self):
+        settings = settings_factory(host=None, port=None, vhost=None,
+            username=None, password=None)
+        self.connection = Connection(settings)
+        self.connection.socket, self.peer = socket.socketpair()
+        self.connection.writer.start()
+        self.prepared = PreparedSend(self.connection, ['/queue/a', '/queue/b'],
+            'text/plain', headers={'foo': 'b:ar'})
+
+    def tearDown(self):
+        self.connection._stop()
+        self.connection.socket.close()
+        self.peer.close()
+
+    def decode(self, raw):
+        parser = self.connection.codec.parser()
+        parser.feed(raw)
+        frames = list(parser)
+        self.assertEqual(len(frames), 1)
+        return frames[0]
+
+    def test_encode(self):
+        frame = self.decode(b''.join(self.prepared.encode("Hello world!")))
+        self.assertEqual(frame.command, SEND)
+        self.assertEqual(frame.body, b"Hello world!")
+        self.assertEqual(frame.headers, {
+            'content-length': '12',
+            'content-type': 'text/plain',
+            'destination': '/queue/a,/queue/b',
+            'foo': 'b:ar'
+        })
+
+    def test_encode_with_receipt(self):
+        raw = b''.join(self.prepared.encode(b"Hello world!", 'abc'))
+        self.assertEqual(self.decode(raw).receipt_id, 'abc')
+
+    def test_encode_does_not_copy_body(self):
+        body = b"Hello world!"
+        self.assertIs(self.prepared.encode(body)[1], body)
+
+    def test_send(self):
+        self.prepared.send("Hello world!")
+        self.prepared.send(b"")
+        self.connection.flush()
+        parser = self.connection.codec.parser()
+        parser.feed(self.peer.recv(4096))
+        self.assertEqual([f.body for f in parser], [b"Hello world!", b""])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import time
+import unittest
+
+from stomp.const import ACK
+from stomp.const import ACK_INDIVIDUAL
+from stomp.const import NACK
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.processpool import ProcessDispatcher
+from stomp.transport.transport import Transport
+
+
+def digest(headers, body):
+    return (os.getpid(), headers['n'], hashlib.md5(body).hexdigest())
+
+
+def accept_even(headers, body):
+    return int(body) % 2 == 0
+
+
+def accept_slowly(headers, body):
+    time.sleep(0.02)
+    return True
+
+
+class DummyMessage(object):
+
+    def __init__(self, n, body):
+        self.headers = {'n': n}
+        self.body = body
+
+
+class ProcessDispatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.results = []
+        self.dispatcher = ProcessDispatcher(digest, processes=2,
+            threshold=1024)
+        self.dispatcher._complete = self.collect
+
+    def tearDown(self):
+        self.dispatcher.close()
+
+    def collect(self, future, msg):
+        self.results.append(future.result())
+
+    def test_handler_runs_in_other_process(self):
+        self.dispatcher.put(DummyMessage(0, b'foo'))
+        self.dispatcher.join()
+        self.assertNotEqual(self.results[0][0], os.getpid())
+
+    def test_large_bodies_use_shared_memory(self):
+        bodies = [os.urandom(n) for n in (10, 1024, 1 << 20)]
+        for n, body in enumerate(bodies):
+            self.dispatcher.put(DummyMessage(n, body))
+        self.dispatcher.join()
+        self.assertEqual(sorted(r[1:] for r in self.results),
+            [(n, hashlib.md5(b).hexdigest()) for n, b in enumerate(bodies)])
+
+    def test_full_pool_pauses(self):
+        events = []
+        dispatcher = ProcessDispatcher(accept_slowly, processes=1, maxsize=4)
+        dispatcher._complete = lambda future, msg: None
+        dispatcher.bind(lambda: events.append('pause'),
+            lambda: events.append('resume'))
+        for n in range(3):
+            dispatcher.put(DummyMessage(n, b'foo'))
+        self.assertEqual(events, [])
+        dispatcher.put(DummyMessage(3, b'foo'))
+        self.assertEqual(events, ['pause'])
+        dispatcher.join()
+        self.assertEqual(events, ['pause', 'resume'])
+        dispatcher.close()
+
+    def test_put_after_close_is_dropped(self):
+        self.dispatcher.close()
+        self.dispatcher.put(DummyMessage(0, b'foo'))
+        self.assertEqual(self.dispatcher.pending, 0)
+
+
+class SubscribeWithProcessesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.transport = Transport(get_broker_settings(self.broker))
+        self.transport.start()
+
+    def tearDown(self):
+        self.transport.stop()
+        self.broker.stop()
+
+    def test_results_are_acknowledged(self):
+        sub = self.transport.subscribe('/queue/foo', handler=accept_even,
+            processes=2, ack_mode=ACK_INDIVIDUAL)
+        for i in range(10):
+            self.transport.send('/queue/foo', 'text/plain', str(i))
+        wait_until(lambda: len(self.broker.received(ACK)
+            + self.broker.received(NACK)) == 10, 5)
+        self.assertEqual(len(self.broker.received(ACK)), 5)
+        self.assertEqual(len(self.broker.received(NACK)), 5)
+        sub.destroy()
+
+    def test_acknowledgements_wait_for_receipts(self):
+        sub = self.transport.subscribe('/queue/foo', handler=accept_slowly,
+            processes=2, max_pending=2, ack_mode=ACK_INDIVIDUAL)
+        for i in range(20):
+            self.transport.send('/queue/foo', 'text/plain', str(i))
+        wait_until(lambda: len(self.broker.received(ACK)) == 20, 5)
+        self.assertEqual(len(self.broker.received(ACK)), 20)
+        self.assertFalse(self.transport.connection.paused)
+        sub.destroy()
+
+
+if __name__ == '__main__':
+    unittest.main()
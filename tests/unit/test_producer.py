@@ -0,0 +1,101 @@
+import socket
+import threading
+import time
+import unittest
+
+from stomp.conf import settings_factory
+from stomp.const import SEND
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.connection import Connection
+from stomp.transport.transport import Transport
+
+
+class PartialWriteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        settings = settings_factory(host=None, port=None, vhost=None,
+            username=None, password=None)
+        self.connection = Connection(settings)
+        self.connection.socket, self.peer = socket.socketpair()
+        self.connection.socket.setblocking(0)
+
+    def tearDown(self):
+        self.connection.socket.close()
+        self.peer.close()
+
+    def test_send_writes_all_data(self):
+        segments = [b'a' * 100000, b'b' * 3, b'', b'c' * 500000]
+        expected = b''.join(segments)
+        received = []
+
+        def read():
+            n = 0
+            while n < len(expected):
+                time.sleep(0.001)
+                received.append(self.peer.recv(65536))
+                n += len(received[-1])
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        self.assertEqual(self.connection._sendall(segments), len(expected))
+        reader.join(5)
+        self.assertEqual(b''.join(received), expected)
+
+
+class BatchPublishingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.transport = Transport(get_broker_settings(self.broker))
+        self.transport.start()
+        self.calls = 0
+        send = self.transport.connection.send
+
+        def counting_send(seq, frames=1, receipt_id=None):
+            self.calls += 1
+            return send(seq, frames, receipt_id)
+        self.transport.connection.send = counting_send
+
+    def tearDown(self):
+        self.transport.stop()
+        self.broker.stop()
+
+    def bodies(self):
+        return [f.body for f in self.broker.received(SEND)]
+
+    def test_send_many(self):
+        messages = [('/queue/foo', 'text/plain', str(i)) for i in range(100)]
+        self.transport.send_many(messages, receipt=True)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.bodies(), [str(i).encode() for i in range(100)])
+
+    def test_producer_flushes_on_size(self):
+        producer = self.transport.producer(linger=10000, max_bytes=1024)
+        for i in range(10):
+            producer.send('/queue/foo', 'text/plain', 'x' * 256)
+        self.assertGreaterEqual(producer.batches, 2)
+        self.assertLess(producer.batches, 10)
+        producer.close()
+        self.transport.send('/queue/foo', 'text/plain', 'x', receipt=True)
+        self.assertEqual(len(self.bodies()), 11)
+
+    def test_producer_flushes_after_linger(self):
+        producer = self.transport.producer(linger=10)
+        for i in range(10):
+            producer.send('/queue/foo', 'text/plain', str(i))
+        wait_until(lambda: not producer.pending)
+        self.assertEqual(producer.pending, 0)
+        self.assertEqual(producer.batches, 1)
+        producer.close()
+
+    def test_producer_context_manager_flushes(self):
+        with self.transport.producer(linger=10000) as producer:
+            producer.send('/queue/foo', 'text/plain', 'foo')
+        self.transport.send('/queue/foo', 'text/plain', 'bar', receipt=True)
+        self.assertEqual(self.bodies(), [b'foo', b'bar'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from stomp.const import HDR_RECEIPT_ID
+from stomp.const import RECEIPT
+from stomp.const import SEND
+from stomp.exc import ConnectionLost
+from stomp.exc import FrameNotConfirmed
+from stomp.frames import Frame
+from stomp.frames import SendFrame
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.connection import Connection
+from stomp.transport.receiptmanager import ReceiptManager
+
+
+class DummyConnection(object):
+
+    def __init__(self):
+        self.handlers = {}
+        self.wakeups = 0
+
+    def register_handler(self, command, handler):
+        self.handlers[command] = handler
+
+    def wakeup(self):
+        self.wakeups += 1
+
+
+class ReceiptManagerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = DummyConnection()
+        self.receipts = ReceiptManager(self.connection)
+
+    def receipt(self, receipt_id):
+        frame = Frame(RECEIPT, [(HDR_RECEIPT_ID, receipt_id)])
+        self.connection.handlers[RECEIPT](frame)
+
+    def test_receipt_resolves_future(self):
+        future = self.receipts.expect('foo', 1000)
+        self.receipt('foo')
+        self.assertTrue(future.result(0))
+        self.assertEqual(self.receipts.in_flight, 0)
+
+    def test_unknown_receipt_is_ignored(self):
+        self.receipt('foo')
+        future = self.receipts.expect('foo', 1000)
+        self.receipt('foo')
+        self.receipt('foo')
+        self.assertTrue(future.result(0))
+
+    def test_deadlines_have_millisecond_precision(self):
+        future = self.receipts.expect('foo', 50)
+        self.assertAlmostEqual(self.receipts.timeout(), 0.05, delta=0.01)
+        self.receipts.expire()
+        self.assertFalse(future.done())
+        time.sleep(0.06)
+        self.receipts.expire()
+        self.assertIsInstance(future.exception(0), FrameNotConfirmed)
+        self.assertEqual(self.receipts.in_flight, 0)
+        self.assertIsNone(self.receipts.timeout())
+
+    def test_deadlines_use_monotonic_clock(self):
+        now = [0.0]
+        receipts = ReceiptManager(DummyConnection(), clock=lambda: now[0])
+        future = receipts.expect('foo', 1000)
+        with mock.patch('time.time', return_value=time.time() + 3600):
+            receipts.expire()
+        self.assertFalse(future.done())
+        now[0] = 1.0
+        receipts.expire()
+        self.assertIsInstance(future.exception(0), FrameNotConfirmed)
+
+    def test_earliest_deadline_wakes_up_loop(self):
+        self.receipts.expect('foo', 1000)
+        self.receipts.expect('bar', 2000)
+        self.assertEqual(self.connection.wakeups, 1)
+        self.receipts.expect('baz', 10)
+        self.assertEqual(self.connection.wakeups, 2)
+
+    def test_confirmed_entries_do_not_leak(self):
+        for i in range(50000):
+            self.receipts.expect(i, 10000)
+            self.receipt(i)
+        self.assertEqual(self.receipts.in_flight, 0)
+        self.assertLess(len(self.receipts.deadlines), 100)
+        self.assertIsNone(self.receipts.timeout())
+
+
+class ReceiptTimeoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker(receipts=False).start()
+        self.connection = Connection(get_broker_settings(self.broker))
+        self.connection.connect()
+        self.connection._receipt_timeout = 50
+
+    def tearDown(self):
+        self.connection.close()
+        self.broker.stop()
+
+    def test_sub_second_timeout(self):
+        frame = SendFrame([('destination', '/queue/foo')], "Hello world!",
+            with_receipt=True)
+        t0 = time.time()
+        self.assertRaises(FrameNotConfirmed, self.connection.send_frame,
+            frame)
+        self.assertGreaterEqual(time.time() - t0, 0.04)
+        self.assertEqual(self.connection._receipts.in_flight, 0)
+
+    def test_unconfirmed_frame_is_not_sent_again(self):
+        frame = SendFrame([('destination', '/queue/foo')], "Hello world!",
+            with_receipt=True)
+        self.assertRaises(FrameNotConfirmed, self.connection.send_frame,
+            frame)
+        self.connection.flush()
+        self.assertTrue(wait_until(lambda: self.broker.received(SEND)))
+        self.assertEqual(len(self.broker.received(SEND)), 1)
+
+
+class PipelinedReceiptsTestCase(unittest.TestCase):
+    broker_options = {}
+    window = 10
+
+    def setUp(self):
+        self.broker = Broker(**self.broker_options).start()
+        settings = get_broker_settings(self.broker,
+            receipt_window=self.window)
+        self.connection = Connection(settings)
+        self.connection.connect()
+
+    def tearDown(self):
+        self.connection.close()
+        self.broker.stop()
+
+    def send(self):
+        frame = SendFrame([('destination', '/queue/foo')], "Hello world!",
+            with_receipt=True)
+        return self.connection.send_frame(frame)
+
+    def test_send_returns_future(self):
+        futures = [self.send() for _ in range(100)]
+        self.assertTrue(all(f.result(2) for f in futures))
+        self.assertEqual(self.connection._receipts.in_flight, 0)
+        self.assertEqual(len(self.broker.received(SEND)), 100)
+
+
+class PipelinedReceiptTimeoutTestCase(PipelinedReceiptsTestCase):
+    broker_options = {'receipts': False}
+    window = 2
+
+    def setUp(self):
+        super(PipelinedReceiptTimeoutTestCase, self).setUp()
+        self.connection._receipt_timeout = 50
+
+    def test_send_returns_future(self):
+        future = self.send()
+        self.assertRaises(FrameNotConfirmed, future.result, 2)
+        self.assertEqual(self.connection._receipts.in_flight, 0)
+
+    def test_full_window_blocks(self):
+        t0 = time.time()
+        futures = [self.send() for _ in range(3)]
+        self.assertGreaterEqual(time.time() - t0, 0.04)
+        self.assertIsInstance(futures[0].exception(0), FrameNotConfirmed)
+        self.assertFalse(futures[2].done())
+
+    def test_expired_frames_are_not_resent(self):
+        self.assertRaises(FrameNotConfirmed, self.send().result, 2)
+        self.assertEqual(len(self.broker.received(SEND)), 1)
+
+    def test_close_fails_pending_frames(self):
+        future = self.send()
+        self.connection.close()
+        self.assertIsNotNone(future.exception(2))
+
+    def test_window_is_not_exhausted_after_error(self):
+        self.broker.drop_clients()
+        self.connection.thread.join(2)
+        self.assertIsNotNone(self.connection._error)
+
+        errors = []
+        def send():
+            for _ in range(2 * self.window):
+                try:
+                    self.send()
+                except ConnectionLost as e:
+                    errors.append(e)
+        thread = threading.Thread(target=send)
+        thread.daemon = True
+        thread.start()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 2 * self.window)
+
+
+if __name__ == '__main__':
+    unittest.main()
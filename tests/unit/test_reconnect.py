@@ -0,0 +1,142 @@
+import unittest
+
+from stomp.const import CONNECT
+from stomp.const import HDR_ID
+from stomp.const import SEND
+from stomp.const import SUBSCRIBE
+from stomp.exc import ConnectionLost
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.test.utils import wait_until
+from stomp.transport.transport import Transport
+
+
+class ReconnectTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.transport = self.get_transport()
+        self.transport.start()
+        self.connection = self.transport.connection
+
+    def tearDown(self):
+        self.transport.stop()
+        self.broker.stop()
+
+    def get_transport(self, **params):
+        params.setdefault('reconnect', True)
+        params.setdefault('reconnect_delay', 10)
+        return Transport(get_broker_settings(self.broker, **params))
+
+    def reconnect(self):
+        reconnects = self.connection.reconnects
+        self.broker.drop_clients()
+        self.assertTrue(wait_until(
+            lambda: self.connection.reconnects > reconnects))
+
+    def test_connect_handshake_is_repeated(self):
+        self.reconnect()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(CONNECT)) == 2))
+        self.assertEqual(self.connection.stats['reconnects'], 1)
+        self.assertIsNone(self.connection._error)
+        self.transport.send('/queue/foo', 'text/plain', 'foo', receipt=True)
+
+    def test_subscriptions_are_replayed(self):
+        sub = self.transport.subscribe('/queue/foo')
+        self.reconnect()
+        self.assertTrue(wait_until(
+            lambda: len(self.broker.received(SUBSCRIBE)) == 2))
+        frames = self.broker.received(SUBSCRIBE)
+        self.assertEqual(frames[0].headers[HDR_ID], sub.sid)
+        self.assertEqual(frames[1].headers[HDR_ID], sub.sid)
+
+        self.transport.send('/queue/foo', 'text/plain', 'foo', receipt=True)
+        self.assertTrue(wait_until(lambda: sub.depth))
+        self.assertEqual([m.body for m in sub.messages], [b'foo'])
+
+    def test_unconfirmed_frames_are_sent_again(self):
+        self.transport.stop()
+        self.transport = self.get_transport(receipt_window=10)
+        self.transport.start()
+        self.connection = self.transport.connection
+
+        self.broker.receipts = False
+        future = self.transport.send('/queue/foo', 'text/plain', 'foo',
+            receipt=True)
+        self.assertTrue(wait_until(lambda: self.broker.received(SEND)))
+        self.assertFalse(future.done())
+
+        self.broker.receipts = True
+        self.reconnect()
+        self.assertTrue(future.result(2))
+        frames = self.broker.received(SEND)
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(frames[0].receipt_id, frames[1].receipt_id)
+
+    def test_backoff(self):
+        delays = []
+        sleep = self.connection._sleep
+        def recording_sleep(seconds):
+            delays.append(seconds)
+            return sleep(seconds)
+        self.connection._sleep = recording_sleep
+
+        # Let the first three attempts fail.
+        connect_socket = self.connection._connect_socket
+        failures = [3]
+        def failing_connect_socket(endpoint):
+            sock = connect_socket(endpoint)
+            if failures[0]:
+                failures[0] -= 1
+                sock.close()
+                raise ConnectionRefusedError
+            return sock
+        self.connection._connect_socket = failing_connect_socket
+
+        self.reconnect()
+        self.assertEqual(len(delays), 4)
+        for attempt, delay in enumerate(delays):
+            upper = 0.01 * 2 ** attempt
+            self.assertGreaterEqual(delay, upper / 2)
+            self.assertLessEqual(delay, upper)
+
+    def test_attempts_are_limited(self):
+        self.transport.stop()
+        self.transport = self.get_transport(reconnect_attempts=2)
+        self.transport.start()
+        self.connection = self.transport.connection
+
+        self.broker.stop()
+        self.connection.thread.join(2)
+        self.assertFalse(self.connection.thread.is_alive())
+        self.assertIsInstance(self.connection._error, EnvironmentError)
+        self.assertEqual(self.connection.reconnects, 0)
+
+    def test_outbound_buffer_is_limited(self):
+        self.transport.stop()
+        self.transport = self.get_transport(reconnect_buffer=4096,
+            reconnect_delay=60000)
+        self.transport.start()
+        self.connection = self.transport.connection
+
+        self.broker.drop_clients()
+        self.assertTrue(wait_until(
+            lambda: not self.connection._online.is_set()))
+        self.transport.send('/queue/foo', 'text/plain', 'x' * 1000)
+        with self.assertRaises(ConnectionLost):
+            for i in range(4):
+                self.transport.send('/queue/foo', 'text/plain', 'x' * 1000)
+
+    def test_disabled_by_default(self):
+        transport = self.get_transport(reconnect=False)
+        transport.start()
+        self.broker.drop_clients()
+        transport.connection.thread.join(1)
+        self.assertFalse(transport.connection.thread.is_alive())
+        self.assertIsNotNone(transport.connection._error)
+        transport.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import socket
+import unittest
+
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.transport.connection import Connection
+from stomp.transport.transport import Transport
+
+
+class SocketOptionsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.transport = None
+
+    def tearDown(self):
+        if self.transport is not None:
+            self.transport.stop()
+        self.broker.stop()
+
+    def connect(self, **params):
+        self.transport = Transport(get_broker_settings(self.broker, **params))
+        self.transport.start()
+        return self.transport.connection.socket
+
+    def test_nodelay_by_default(self):
+        sock = self.connect()
+        self.assertTrue(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+    def test_nodelay_disabled(self):
+        sock = self.connect(tcp_nodelay=False)
+        self.assertFalse(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+    def test_buffer_sizes(self):
+        sock = self.connect(rcvbuf=65536, sndbuf=131072)
+        # Linux reports twice the requested size.
+        self.assertGreaterEqual(
+            sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), 65536)
+        self.assertGreaterEqual(
+            sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF), 131072)
+
+    def test_keepalive(self):
+        sock = self.connect(keepalive=(30, 5, 3))
+        self.assertTrue(sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE))
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            self.assertEqual(
+                sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE), 30)
+            self.assertEqual(
+                sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL), 5)
+            self.assertEqual(
+                sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT), 3)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'),
+        "Unix domain sockets are not available")
+    def test_tcp_options_are_ignored_for_unix_sockets(self):
+        settings = get_broker_settings(self.broker, keepalive=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            Connection.configure_socket(settings, sock)
+        finally:
+            sock.close()
+
+
+class ReadSizeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = Broker().start()
+        self.transport = Transport(get_broker_settings(self.broker))
+        self.transport.start()
+        self.connection = self.transport.connection
+
+    def tearDown(self):
+        self.transport.stop()
+        self.broker.stop()
+
+    def test_read_size_grows_for_large_messages(self):
+        sub = self.transport.subscribe('/queue/foo')
+        self.transport.send('/queue/foo', 'text/plain', 'x' * (1 << 20),
+            receipt=True)
+        msgs = list(sub.messages)
+        self.assertEqual(len(msgs[0].body), 1 << 20)
+        self.assertGreater(self.connection.read_size, Connection.buf_size)
+        self.assertLessEqual(self.connection.read_size, Connection.max_buf_size)
+
+    def test_read_size_shrinks_after_short_reads(self):
+        connection = Connection(get_broker_settings(self.broker))
+        for i in range(3):
+            connection._adapt_read_size(connection.read_size)
+        self.assertEqual(connection.read_size, 8 * Connection.buf_size)
+        for i in range(15):
+            connection._adapt_read_size(10)
+        self.assertEqual(connection.read_size, 8 * Connection.buf_size)
+        connection._adapt_read_size(10)
+        self.assertEqual(connection.read_size, 4 * Connection.buf_size)
+        for i in range(100):
+            connection._adapt_read_size(10)
+        self.assertEqual(connection.read_size, Connection.buf_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from stomp.aio import AsyncTransport
+from stomp.const import SEND
+from stomp.const import SUBSCRIBE
+from stomp.test.broker import Broker
+from stomp.test.utils import get_broker_settings
+from stomp.transport.endpoints import parse_endpoint
+from stomp.transport.transport import Transport
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'),
+    "Unix domain sockets are not available")
+class UnixSocketTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'broker.sock')
+        self.broker = Broker(socket.AF_UNIX, self.path).start()
+
+    def tearDown(self):
+        self.broker.stop()
+        shutil.rmtree(self.tempdir)
+
+    def test_parse_endpoint(self):
+        self.assertEqual(parse_endpoint('unix://' + self.path), self.path)
+        self.assertEqual(parse_endpoint(('unix://' + self.path, None)),
+            self.path)
+        self.assertRaises(ValueError, parse_endpoint, 'unix://')
+
+    def test_send_and_receive(self):
+        transport = Transport(get_broker_settings(self.broker))
+        transport.start()
+        try:
+            self.assertEqual(transport.connection.socket.family,
+                socket.AF_UNIX)
+            sub = transport.subscribe('/queue/foo')
+            transport.send('/queue/foo', 'text/plain', 'foo', receipt=True)
+            self.assertEqual([m.body for m in sub.messages], [b'foo'])
+        finally:
+            transport.stop()
+        self.assertEqual(len(self.broker.received(SUBSCRIBE)), 1)
+
+    def test_endpoints(self):
+        settings = get_broker_settings(self.broker,
+            endpoints=['unix://' + self.path])
+        transport = Transport(settings)
+        transport.start()
+        transport.stop()
+        self.assertEqual(transport.connection.endpoint, self.path)
+
+    def test_asyncio(self):
+        async def main():
+            transport = AsyncTransport(get_broker_settings(self.broker))
+            await transport.start()
+            try:
+                await transport.send('/queue/foo', 'text/plain', 'foo',
+                    receipt=True)
+            finally:
+                await transport.stop()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(asyncio.wait_for(main(), 5))
+        finally:
+            loop.close()
+        self.assertEqual(len(self.broker.received(SEND)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()